@@ -0,0 +1,58 @@
+"""
+Compare open_box_n_times with the chunked simulation engine:
+
+    python -m calculator.benchmarks.mock_open --sizes 1000 100000 10000000
+"""
+import argparse
+from decimal import Decimal
+from time import perf_counter
+
+import numpy as np
+
+from calculator.utils.blackbox import open_box_n_times
+from calculator.utils.simulation import simulate_openings
+
+
+SIZES = (10 ** 3, 10 ** 5, 10 ** 7)
+COSTS = (1000, 300, 100)
+SHARES = (0.1, 0.3, 0.6)
+PRICE = 290
+
+
+def make_box(n):
+    amounts = [max(1, int(n * share)) for share in SHARES]
+    return amounts, list(COSTS), PRICE
+
+
+def time_reference(n):
+    amounts, costs, price = make_box(n)
+    start = perf_counter()
+    open_box_n_times(n, amounts, [Decimal(cost) for cost in costs], Decimal(price))
+    return perf_counter() - start
+
+
+def time_engine(n):
+    amounts, costs, price = make_box(n)
+    start = perf_counter()
+    simulate_openings(n, amounts, costs, price, np.random.default_rng())
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    parser.add_argument('--max-reference', type=int, default=None,
+                        help='skip open_box_n_times for larger n')
+    args = parser.parse_args()
+    print(f'{"n":>10} {"reference, s":>14} {"engine, s":>12} {"speedup":>9}')
+    for n in args.sizes:
+        engine = time_engine(n)
+        if args.max_reference is not None and n > args.max_reference:
+            print(f'{n:>10} {"-":>14} {engine:>12.4f} {"-":>9}')
+            continue
+        reference = time_reference(n)
+        print(f'{n:>10} {reference:>14.4f} {engine:>12.4f} {reference / engine:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,53 @@
+"""
+Compare the previous greedy Decimal rounding with largest remainder rounding:
+
+    python -m calculator.benchmarks.round_preserving_sum --sizes 1000 100000
+"""
+import argparse
+from decimal import Decimal
+from time import perf_counter
+
+import numpy as np
+
+from calculator.utils.bingo import BingoUtil
+
+
+SIZES = (10 ** 3, 10 ** 5)
+
+
+def greedy_round_preserving_sum(amounts):
+    spare_amount = 0
+    res = []
+    for amount in amounts:
+        if int(amount) == amount:
+            res.append(int(amount))
+        elif int(amount) + 1 - amount <= Decimal(spare_amount) + Decimal(1e-2):
+            spare_amount -= int(amount) + 1 - amount
+            res.append(int(amount + 1))
+        else:
+            spare_amount += amount - int(amount)
+            res.append(int(amount))
+    return res
+
+
+def timed(func, *args):
+    start = perf_counter()
+    func(*args)
+    return perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', type=int, nargs='+', default=SIZES)
+    args = parser.parse_args()
+    rng = np.random.default_rng()
+    print(f'{"n":>8} {"greedy, s":>11} {"hamilton, s":>12} {"speedup":>9}')
+    for n in args.sizes:
+        amounts = rng.uniform(0, 100, n).tolist()
+        greedy = timed(greedy_round_preserving_sum, amounts)
+        hamilton = timed(BingoUtil.round_preserving_sum, amounts)
+        print(f'{n:>8} {greedy:>11.4f} {hamilton:>12.4f} {greedy / hamilton:>8.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Benchmark scenarios. util.* time the pure calculation layer, api.* go through
+the DRF endpoints with the test client and need a database.
+"""
+from decimal import Decimal
+
+import numpy as np
+from django.urls import reverse
+from rest_framework.test import APIClient
+
+from calculator.benchmarks.suite import scenario
+from calculator.models.lottery import Lottery
+from calculator.utils.bingo import MiniBingoUtil, DiscountBingoUtil
+from calculator.utils.blackbox import BlackBoxUtil, open_box_n_times
+from calculator.utils.lottery import LotteryUtil
+from calculator.utils.simulation import simulate_openings
+
+
+BOX_COSTS = (1000, 300, 100)
+BOX_SHARES = (0.1, 0.3, 0.6)
+BOX_PRICE = 290
+LOT_COSTS = {'costly': 1000, 'middle': 300, 'cheap': 100}
+BINGO_SHAPES = ((10, 10), (100, 20), (1000, 50))
+TICKET_AMOUNTS = (10 ** 2, 10 ** 3, 10 ** 4, 10 ** 5, 10 ** 6)
+
+
+def box(n):
+    return [max(1, int(n * share)) for share in BOX_SHARES]
+
+
+def black_box_data(costly_amount):
+    return {'lot_cost': LOT_COSTS, 'costly_amount': costly_amount,
+            'rentability': 0.2, 'loyalty': 0.6, 'black_box_cost': 0}
+
+
+def bingo_data(n, k):
+    rng = np.random.default_rng(n * k)
+    return {
+        'prices': rng.integers(100, 5000, n).tolist(),
+        'discounts': np.round(rng.uniform(0.01, 0.99, k), 2).tolist(),
+        'budget': 50 * n * k, 'lucky_participants': 5 * n * k,
+        'usage_probability': 1, 'unlucky_participants': None,
+        'budget_distribution': None,
+    }
+
+
+def lottery_data(ticket_amount, storage='dense'):
+    return {
+        'name': 'Benchmark',
+        'lots': [{'amount': 1, 'price': 1000}, {'amount': 2, 'price': 500},
+                 {'amount': 3, 'price': 200}],
+        'write_off': 1000, 'referral_coeff': 4, 'ticket_amount': ticket_amount,
+        'total_cost': 2600, 'ticket_price': 150, 'min_profit': 250,
+        'min_rentability': 0.1, 'max_rentability': 0.38, 'discount': 0.05,
+        'storage': storage,
+    }
+
+
+@scenario('util.blackbox.calculate', params=(10, 100, 1000))
+def black_box_util(costly_amount):
+    data = black_box_data(costly_amount)
+    return lambda: BlackBoxUtil(**data).to_json()
+
+
+@scenario('util.blackbox.open_box_n_times', params=(10 ** 2, 10 ** 3, 10 ** 4), quick=2)
+def open_box(n):
+    costs = [Decimal(cost) for cost in BOX_COSTS]
+    return lambda: open_box_n_times(n, box(n), costs, Decimal(BOX_PRICE))
+
+
+@scenario('util.blackbox.simulate_openings', params=(10 ** 3, 10 ** 5, 10 ** 6), quick=2)
+def simulate(n):
+    return lambda: simulate_openings(n, box(n), list(BOX_COSTS), BOX_PRICE, seed=42)
+
+
+@scenario('util.bingo.mini', params=(10, 50), quick=2)
+def mini_bingo(k):
+    discounts = [(i + 1) / (k + 1) for i in range(k)]
+    return lambda: MiniBingoUtil(1000.0, discounts, 500.0 * k, 10 * k)
+
+
+@scenario('util.bingo.discount', params=BINGO_SHAPES, quick=2)
+def discount_bingo(shape):
+    data = bingo_data(*shape)
+    return lambda: DiscountBingoUtil(**data).to_json()
+
+
+@scenario('util.lottery.calculate', params=TICKET_AMOUNTS, quick=2)
+def lottery_util(ticket_amount):
+    data = lottery_data(ticket_amount)
+    return lambda: LotteryUtil(data['lots'], data['write_off'], ticket_amount,
+                               data['ticket_price'], data['referral_coeff'],
+                               data['discount']).to_json()
+
+
+@scenario('util.lottery.lucky_numbers', params=TICKET_AMOUNTS, quick=2)
+def lucky_numbers(ticket_amount):
+    data = lottery_data(ticket_amount)
+    return lambda: Lottery.lucky_numbers(data, np.random.default_rng(42))
+
+
+def post(name, data, suffix=''):
+    api = APIClient()
+    url = reverse(name) + suffix
+
+    def run():
+        response = api.post(url, data=data, format='json')
+        assert response.status_code < 300, response.content[:200]
+    return run
+
+
+def delete_lotteries():
+    Lottery.objects.all().delete()
+
+
+@scenario('api.blackbox.calculate', params=(10, 100, 1000))
+def black_box_api(costly_amount):
+    return post('blackbox-list', black_box_data(costly_amount), 'calculate/')
+
+
+@scenario('api.blackbox.mock_open_unsaved', params=(10 ** 3, 10 ** 5), quick=1)
+def mock_open_api(n):
+    amounts = dict(zip(LOT_COSTS, box(n)))
+    return post('blackbox-list', {
+        'name': 'Benchmark', 'price': BOX_PRICE, 'lot_cost': LOT_COSTS,
+        'lot_amount': amounts, 'n': n, 'output': 'aggregate', 'seed': 42,
+    }, 'mock_open_unsaved/')
+
+
+@scenario('api.bingo.calculate', params=BINGO_SHAPES, quick=2)
+def bingo_api(shape):
+    return post('bingodiscount-list', bingo_data(*shape), 'calculate/')
+
+
+@scenario('api.lottery.create_dense', params=TICKET_AMOUNTS, quick=2,
+          teardown=delete_lotteries)
+def lottery_dense_api(ticket_amount):
+    return post('lottery-list', lottery_data(ticket_amount, 'dense'))
+
+
+@scenario('api.lottery.create_sparse', params=TICKET_AMOUNTS, quick=2,
+          teardown=delete_lotteries)
+def lottery_sparse_api(ticket_amount):
+    return post('lottery-list', lottery_data(ticket_amount, 'sparse'))
@@ -0,0 +1,122 @@
+"""
+Registry and runner of the benchmark scenarios, see the bench management
+command. A scenario builds its inputs for a parameter and returns the
+callable that is timed, setup is not measured.
+"""
+import platform
+import statistics
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Sequence
+
+import django
+import numpy as np
+
+
+class Scenario:
+    def __init__(self, name: str, setup: Callable, params: Sequence,
+                 quick: int = 1, teardown: Optional[Callable] = None):
+        self.name = name
+        self.layer = name.split('.')[0]
+        self.setup = setup
+        self.params = list(params)
+        self.quick = quick
+        self.teardown = teardown
+
+    def get_params(self, quick: bool = False) -> List:
+        return self.params[:self.quick] if quick else self.params
+
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+
+def scenario(name: str, params: Sequence, quick: int = 1,
+             teardown: Optional[Callable] = None):
+    def register(setup):
+        SCENARIOS[name] = Scenario(name, setup, params, quick, teardown)
+        return setup
+    return register
+
+
+def param_label(param) -> str:
+    if isinstance(param, (tuple, list)):
+        return 'x'.join(map(str, param))
+    return str(param)
+
+
+def result_key(result: Dict) -> str:
+    return f'{result["scenario"]}[{result["param"]}]'
+
+
+def measure(scenario: Scenario, param, repeat: int) -> Dict:
+    run = scenario.setup(param)
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        run()
+        times.append(perf_counter() - start)
+        if scenario.teardown is not None:
+            scenario.teardown()
+    return {
+        'scenario': scenario.name,
+        'layer': scenario.layer,
+        'param': param_label(param),
+        'repeat': repeat,
+        'min': min(times),
+        'median': statistics.median(times),
+        'mean': statistics.mean(times),
+    }
+
+
+def select(patterns: Optional[Sequence[str]] = None,
+           layers: Optional[Sequence[str]] = None) -> List[Scenario]:
+    """scenarios whose name starts with one of patterns and lie in one of layers"""
+    return [s for name, s in SCENARIOS.items()
+            if (not patterns or any(name.startswith(p) for p in patterns))
+            and (not layers or s.layer in layers)]
+
+
+def run_suite(scenarios: Sequence[Scenario], repeat: int = 5, quick: bool = False,
+              log: Optional[Callable[[Dict], None]] = None) -> Dict:
+    results = []
+    for s in scenarios:
+        for param in s.get_params(quick):
+            result = measure(s, param, repeat)
+            if log is not None:
+                log(result)
+            results.append(result)
+    return {
+        'meta': {
+            'created': datetime.now(timezone.utc).isoformat(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'repeat': repeat,
+            'quick': quick,
+        },
+        'results': results,
+    }
+
+
+def compare(baseline: Dict, current: Dict, threshold: float = 0.2,
+            metric: str = 'min') -> List[Dict]:
+    """
+    Results present in both runs with the ratio of their times,
+    a slowdown by more than threshold (0.2 is 20%) is a regression
+    """
+    before = {result_key(result): result for result in baseline['results']}
+    rows = []
+    for result in current['results']:
+        old = before.get(result_key(result))
+        if old is None:
+            continue
+        ratio = result[metric] / old[metric] if old[metric] > 0 else float('inf')
+        rows.append({
+            'key': result_key(result),
+            'baseline': old[metric],
+            'current': result[metric],
+            'ratio': ratio,
+            'regression': ratio > 1 + threshold,
+        })
+    return rows
@@ -0,0 +1,174 @@
+import hashlib
+import json
+import secrets
+import threading
+from collections import OrderedDict
+from time import monotonic
+from typing import Callable, Dict, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+
+
+DEFAULTS = {
+    'ALIAS': None,
+    'MAX_SIZE': 1024,
+    'TTL': 300,
+    'KEY_PREFIX': 'calculate',
+}
+
+
+class CalculationCache:
+    """
+    Results of util_class(**data).to_json() keyed by a hash of the util class
+    and the canonical JSON of data. A bounded in-process LRU, optionally in
+    front of a Django cache backend that the workers share (alias, never a
+    per-process one like LocMem); both expire entries after ttl seconds.
+    """
+    def __init__(self, max_size: int, ttl: int, alias: Optional[str] = None,
+                 key_prefix: str = 'calculate'):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        self.local_hits = 0
+        self.backend_hits = 0
+        self.misses = 0
+
+    @property
+    def backend(self):
+        return caches[self.alias] if self.alias is not None else None
+
+    def key(self, util_class, data: Dict) -> str:
+        payload = json.dumps(data, sort_keys=True, default=str, separators=(',', ':'))
+        name = f'{util_class.__module__}.{util_class.__qualname__}'
+        digest = hashlib.sha256(f'{name}:{payload}'.encode()).hexdigest()
+        return f'{self.key_prefix}:{digest}'
+
+    def get_or_compute(self, util_class, data: Dict, compute: Callable[[], Dict]) -> Dict:
+        key = self.key(util_class, data)
+        value = self.get_local(key)
+        if value is not None:
+            with self.lock:
+                self.local_hits += 1
+            return value
+        if self.backend is not None:
+            value = self.backend.get(key)
+            if value is not None:
+                with self.lock:
+                    self.backend_hits += 1
+                self.set_local(key, value)
+                return value
+        with self.lock:
+            self.misses += 1
+        value = compute()
+        self.set_local(key, value)
+        if self.backend is not None:
+            self.backend.set(key, value, timeout=self.ttl)
+        return value
+
+    def get_local(self, key: str) -> Optional[Dict]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at <= monotonic():
+                del self.entries[key]
+                return None
+            self.entries.move_to_end(key)
+            return value
+
+    def set_local(self, key: str, value: Dict):
+        if self.max_size <= 0:
+            return
+        with self.lock:
+            self.entries[key] = (monotonic() + self.ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.local_hits = self.backend_hits = self.misses = 0
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {
+                'hits': self.local_hits + self.backend_hits,
+                'local_hits': self.local_hits,
+                'backend_hits': self.backend_hits,
+                'misses': self.misses,
+                'size': len(self.entries),
+                'max_size': self.max_size,
+                'ttl': self.ttl,
+                'alias': self.alias,
+            }
+
+
+_calculation_cache = None
+
+
+def get_calculation_cache() -> CalculationCache:
+    global _calculation_cache
+    if _calculation_cache is None:
+        options = {**DEFAULTS, **getattr(settings, 'CALCULATE_CACHE', {})}
+        _calculation_cache = CalculationCache(options['MAX_SIZE'], options['TTL'],
+                                              options['ALIAS'], options['KEY_PREFIX'])
+    return _calculation_cache
+
+
+@receiver(setting_changed)
+def reset_calculation_cache(setting, **kwargs):
+    global _calculation_cache
+    if setting in ('CALCULATE_CACHE', 'CACHES'):
+        _calculation_cache = None
+
+
+LOTTERY_SESSION_TTL = 3600
+
+
+def lottery_session_cache():
+    """must be shared by all workers, a session is continued by any of them"""
+    return caches[getattr(settings, 'LOTTERY_SESSION_CACHE', 'default')]
+
+
+def lottery_session_key(token: str) -> str:
+    return f'lottery-session:{token}'
+
+
+class LotterySessionConflict(Exception):
+    """the session was changed by another request since it was loaded"""
+
+
+def save_lottery_session(session, token: Optional[str] = None,
+                         version: Optional[int] = None) -> str:
+    """
+    Store a new session, or one loaded at version as version + 1. Only one
+    request can claim the next version, so concurrent changes of a session
+    raise LotterySessionConflict instead of overwriting each other.
+    """
+    cache = lottery_session_cache()
+    ttl = getattr(settings, 'LOTTERY_SESSION_TTL', LOTTERY_SESSION_TTL)
+    if token is None:
+        token, version = secrets.token_hex(16), 0
+    else:
+        version += 1
+        if not cache.add(f'{lottery_session_key(token)}:{version}', True, timeout=ttl):
+            raise LotterySessionConflict(token)
+    cache.set(lottery_session_key(token), (version, session), timeout=ttl)
+    return token
+
+
+def load_lottery_session(token: str) -> Optional[Tuple[int, object]]:
+    """the version and the session, None if it expired"""
+    return lottery_session_cache().get(lottery_session_key(token))
+
+
+def delete_lottery_session(token: str):
+    lottery_session_cache().delete(lottery_session_key(token))
@@ -0,0 +1,73 @@
+"""
+Sweeps run from the request cycle instead of a scheduler. Each one runs at
+most once per interval across the workers that share its cache, so the cache
+must be shared (the 'shared' alias in settings); with a per-process cache
+such as LocMem the interval holds per process only. A worker asks the cache
+at most once per interval too. A sweep that fails is logged and skipped, the
+request that ran it still succeeds.
+"""
+import logging
+from time import monotonic
+from typing import Dict, Optional
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.signals import setting_changed
+from django.db import DatabaseError, transaction
+from django.dispatch import receiver
+
+from calculator.models.product import Product
+from calculator.queries import query_budget
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    'INTERVAL': 3600,
+    'BATCH_SIZE': 1000,
+    'MAX_BATCHES': 1,
+    'CACHE': 'default',
+}
+
+SWEEP_KEY = 'housekeeping:mock-products'
+# claiming the interval in a database cache: a count, a read and a write in a
+# savepoint that is rolled back when the key exists, a cull of four more
+THROTTLE_QUERIES = 10
+
+
+def mock_products_gc_options() -> Dict:
+    return {**DEFAULTS, **getattr(settings, 'MOCK_PRODUCTS_GC', {})}
+
+
+_next_sweep = 0.0
+
+
+def sweep_mock_products() -> Optional[int]:
+    """delete a few batches of unreferenced mock products, None if it is not time yet"""
+    global _next_sweep
+    options = mock_products_gc_options()
+    if not options['INTERVAL'] or monotonic() < _next_sweep:
+        return None
+    _next_sweep = monotonic() + options['INTERVAL']
+    # two selects and a delete for the products and each reverse relation per
+    # batch, the sweep and each batch in their own savepoint when the sweep
+    # runs inside a transaction
+    budget = THROTTLE_QUERIES + 2 + 7 * options['MAX_BATCHES']
+    with query_budget(budget, 'sweep_mock_products'):
+        try:
+            with transaction.atomic():
+                if not caches[options['CACHE']].add(SWEEP_KEY, True,
+                                                    timeout=options['INTERVAL']):
+                    return None
+                return Product.delete_unreferenced_mocks(options['BATCH_SIZE'],
+                                                         options['MAX_BATCHES'])
+        except DatabaseError:
+            logger.exception('sweep_mock_products failed')
+            return None
+
+
+@receiver(setting_changed)
+def reset_sweep_deadline(setting, **kwargs):
+    global _next_sweep
+    if setting in ('MOCK_PRODUCTS_GC', 'CACHES'):
+        _next_sweep = 0.0
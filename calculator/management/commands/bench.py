@@ -0,0 +1,76 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import (override_settings, setup_databases, setup_test_environment,
+                               teardown_databases, teardown_test_environment)
+
+from calculator.benchmarks import scenarios  # noqa: F401, registers the scenarios
+from calculator.benchmarks.suite import SCENARIOS, compare, run_suite, select
+
+
+class Command(BaseCommand):
+    help = 'Time the calculator utilities and endpoints, optionally against a baseline'
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*',
+                            help='run only scenarios whose name starts with one of these')
+        parser.add_argument('--layer', action='append', choices=('util', 'api'),
+                            help='run only this layer, can be repeated')
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--quick', action='store_true',
+                            help='only the smallest parameters of every scenario')
+        parser.add_argument('--output', help='write the results as JSON to this file')
+        parser.add_argument('--compare', metavar='BASELINE',
+                            help='JSON file of a previous run to compare with')
+        parser.add_argument('--threshold', type=float, default=0.2,
+                            help='slowdown treated as a regression, 0.2 is 20%%')
+        parser.add_argument('--list', action='store_true', help='list the scenarios and exit')
+
+    def handle(self, *args, **options):
+        if options['list']:
+            for name, scenario in SCENARIOS.items():
+                params = ', '.join(map(str, scenario.params))
+                self.stdout.write(f'{name}: {params}')
+            return
+        selected = select(options['scenarios'], options['layer'])
+        if not selected:
+            raise CommandError('No scenarios selected')
+        baseline = None
+        if options['compare']:
+            with open(options['compare']) as f:
+                baseline = json.load(f)
+
+        report = self.run(selected, options)
+        if options['output']:
+            with open(options['output'], 'w') as f:
+                json.dump(report, f, indent=2)
+        else:
+            self.stdout.write(json.dumps(report, indent=2))
+
+        if baseline is not None:
+            rows = compare(baseline, report, options['threshold'])
+            regressions = [row for row in rows if row['regression']]
+            for row in rows:
+                mark = 'SLOWER' if row['regression'] else ''
+                self.stderr.write(f'{row["key"]:<50} {row["baseline"]:>10.4f} '
+                                  f'{row["current"]:>10.4f} {row["ratio"]:>6.2f}x {mark}')
+            if regressions:
+                raise CommandError(f'{len(regressions)} scenarios are slower than the baseline '
+                                   f'by more than {options["threshold"]:.0%}')
+
+    def run(self, selected, options):
+        def log(result):
+            self.stderr.write(f'{result["scenario"]}[{result["param"]}]: {result["min"]:.4f}s')
+
+        if not any(scenario.layer == 'api' for scenario in selected):
+            return run_suite(selected, options['repeat'], options['quick'], log)
+        # the endpoints run against a throwaway test database, without the
+        # calculation cache which would turn every repeat into a cache hit
+        setup_test_environment()
+        old_config = setup_databases(verbosity=0, interactive=False)
+        try:
+            with override_settings(CALCULATE_CACHE={'ALIAS': None, 'MAX_SIZE': 0}):
+                return run_suite(selected, options['repeat'], options['quick'], log)
+        finally:
+            teardown_databases(old_config, verbosity=0)
+            teardown_test_environment()
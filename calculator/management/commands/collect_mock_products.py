@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+
+from calculator.models.product import Product
+
+
+class Command(BaseCommand):
+    help = 'Delete the mock products that no black box or lottery uses anymore'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=1000,
+                            help='products deleted per query')
+        parser.add_argument('--max-batches', type=int, default=None,
+                            help='stop after this many batches')
+        parser.add_argument('--dry-run', action='store_true',
+                            help='only count the unreferenced mock products')
+
+    def handle(self, *args, **options):
+        if options['dry_run']:
+            count = Product.unreferenced_mocks().count()
+            self.stdout.write(f'{count} unreferenced mock products')
+            return
+        deleted = Product.delete_unreferenced_mocks(options['batch_size'],
+                                                    options['max_batches'])
+        self.stdout.write(f'Deleted {deleted} mock products')
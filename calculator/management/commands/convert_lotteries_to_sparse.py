@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from calculator.models.lottery import Lottery
+
+
+class Command(BaseCommand):
+    help = 'Drop the losing tickets of dense lotteries and keep only the winning ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--min-tickets', type=int, default=0,
+                            help='convert only lotteries with at least this many tickets')
+
+    def handle(self, *args, **options):
+        converted = 0
+        for lottery in Lottery.objects.filter(storage=Lottery.DENSE).iterator():
+            if lottery.ticket_amount() < options['min_tickets']:
+                continue
+            lottery.make_sparse()
+            converted += 1
+        self.stdout.write(f'Converted {converted} lotteries')
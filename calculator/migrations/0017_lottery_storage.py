@@ -0,0 +1,37 @@
+# Generated by Django 3.2.8 on 2026-10-18 18:59
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def set_total_tickets(apps, schema_editor):
+    Lottery = apps.get_model('calculator', 'Lottery')
+    lotteries = list(Lottery.objects.annotate(ticket_count=Count('lottery_items')))
+    for lottery in lotteries:
+        lottery.total_tickets = lottery.ticket_count
+    Lottery.objects.bulk_update(lotteries, ['total_tickets'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0016_auto_20211125_0906'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lottery',
+            name='storage',
+            field=models.CharField(choices=[('dense', 'every ticket is stored'), ('sparse', 'only winning tickets are stored')], default='dense', max_length=6),
+        ),
+        migrations.AddField(
+            model_name='lottery',
+            name='total_tickets',
+            field=models.PositiveIntegerField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='ticket',
+            index=models.Index(fields=['lottery', 'number'], name='calculator__lottery_13791d_idx'),
+        ),
+        migrations.RunPython(set_total_tickets, migrations.RunPython.noop),
+    ]
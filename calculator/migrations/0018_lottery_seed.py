@@ -0,0 +1,18 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:16
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0017_lottery_storage'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lottery',
+            name='seed',
+            field=models.CharField(blank=True, default='', help_text='seed of the lucky numbers, 128 bit integer', max_length=39),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0018_lottery_seed'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='product',
+            index=models.Index(fields=['name', 'price'], name='calculator__name_fdf7ae_idx'),
+        ),
+    ]
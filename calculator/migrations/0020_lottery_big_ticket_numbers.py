@@ -0,0 +1,23 @@
+# Generated by Django 3.2.8 on 2026-10-18 19:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0019_product_name_price_index'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='lottery',
+            name='total_tickets',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='ticket',
+            name='number',
+            field=models.PositiveBigIntegerField(),
+        ),
+    ]
@@ -0,0 +1,18 @@
+from django.core.management import call_command
+from django.db import migrations
+
+
+def create_cache_tables(apps, schema_editor):
+    """the tables of the database caches in CACHES, lottery sessions live there"""
+    call_command('createcachetable', database=schema_editor.connection.alias, verbosity=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('calculator', '0020_lottery_big_ticket_numbers'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_cache_tables, migrations.RunPython.noop),
+    ]
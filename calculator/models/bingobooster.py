@@ -4,6 +4,14 @@ from django.db import models
 class BingoBooster(models.Model):
     name = models.CharField(max_length=127)
 
+    @classmethod
+    def from_json(cls, data, instance=None):
+        if instance is None:
+            return BingoBooster.objects.create(**data)
+        for key, value in data.items():
+            setattr(instance, key, value)
+        return instance
+
 
 class BoosterFix(models.Model):
     amount = models.IntegerField()
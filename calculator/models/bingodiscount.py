@@ -1,6 +1,14 @@
-from django.db import models
+from django.db import models, transaction
+from functools import cached_property
 from operator import attrgetter
 
+from calculator.models.bulk import bulk_create_with_pks, insert_queries
+from calculator.queries import budgeted, query_budget
+
+
+DISCOUNT_PRODUCT_BATCH_SIZE = 1000
+FROM_JSON_QUERIES = 10
+
 
 class BingoDiscount(models.Model):
     name = models.CharField(max_length=127)
@@ -24,45 +32,62 @@ class BingoDiscount(models.Model):
         budget_distribution = data.pop('budget_distribution')
         participants_per_lot = data.pop('participants_per_lot')
         amounts = data.pop('amounts')
-        if instance is None:
-            instance = BingoDiscount.objects.create(**data)
-        else:
-            instance = cls.set_properties(instance, **data)
-            instance.bingo_items.all().delete()
-
-        cls.set_discount_products(prices, budget_distribution, participants_per_lot,
-                                  amounts, discounts, instance)
+        with query_budget(cls.from_json_queries(len(prices), len(discounts)),
+                          'BingoDiscount.from_json'), transaction.atomic():
+            if instance is None:
+                instance = BingoDiscount.objects.create(**data)
+            else:
+                instance = cls.set_properties(instance, **data)
+                instance.delete_items()
+
+            cls.set_discount_products(prices, budget_distribution, participants_per_lot,
+                                      amounts, discounts, instance)
+        instance.clear_items_cache()
 
         return instance
 
+    @staticmethod
+    def from_json_queries(n, k):
+        """lots, discounts and the n x k matrix, a few more for the bingo itself"""
+        return (FROM_JSON_QUERIES + insert_queries(Lot, n, with_pks=True)
+                + insert_queries(Discount, k, with_pks=True)
+                + insert_queries(DiscountProduct, n * k, DISCOUNT_PRODUCT_BATCH_SIZE))
+
     @staticmethod
     def get_discounts(discounts):
-        discounts = [Discount.objects.create(value=discount)
-                     for discount in discounts]
-        for discount in discounts:
-            discount.save()
-        return discounts
+        discounts = [Discount(value=discount) for discount in discounts]
+        return bulk_create_with_pks(Discount, discounts)
 
     @staticmethod
     def get_lots(prices, budget_distribution, participants_per_lot):
-        lots = [Lot.objects.create(price=price, budget_in_percents=budget_in_percents,
-                                   participants=participants)
+        lots = [Lot(price=price, budget_in_percents=budget_in_percents,
+                    participants=participants)
                 for price, budget_in_percents, participants
                 in zip(prices, budget_distribution, participants_per_lot)]
-        for lot in lots:
-            lot.save()
-        return lots
+        return bulk_create_with_pks(Lot, lots)
 
     @classmethod
     def set_discount_products(cls, prices, budget_distribution, participants_per_lot, amounts, discounts, instance):
         lots = cls.get_lots(prices, budget_distribution, participants_per_lot)
         discounts = cls.get_discounts(discounts)
-        for row, lot in zip(amounts, lots):
-            for amount, discount in zip(row, discounts):
-                discount_product = DiscountProduct.objects.create(discount=discount,
-                                                                  lot=lot, amount=amount,
-                                                                  bingo=instance)
-                discount_product.save()
+        discount_products = [DiscountProduct(discount=discount, lot=lot,
+                                             amount=amount, bingo=instance)
+                             for row, lot in zip(amounts, lots)
+                             for amount, discount in zip(row, discounts)]
+        DiscountProduct.objects.bulk_create(discount_products,
+                                            batch_size=DISCOUNT_PRODUCT_BATCH_SIZE)
+
+    def delete(self, *args, **kwargs):
+        """lots and discounts are not owned through a foreign key, so they go first"""
+        with transaction.atomic():
+            self.delete_items()
+            return super().delete(*args, **kwargs)
+
+    def delete_items(self):
+        """delete the matrix together with its lots and discounts"""
+        ids = list(self.bingo_items.values_list('lot_id', 'discount_id'))
+        Lot.objects.filter(id__in={lot_id for lot_id, _ in ids}).delete()
+        Discount.objects.filter(id__in={discount_id for _, discount_id in ids}).delete()
 
     @classmethod
     def set_properties(cls, instance, **kwargs):
@@ -80,27 +105,36 @@ class BingoDiscount(models.Model):
         return [lot.price for lot in self.lots()]
 
     def set_discounts(self):
-        discounts = {bingo.discount for bingo in self.bingo_items.all()}
-        return sorted(discounts, key=attrgetter('id'))
+        return self._matrix[1]
 
     def discounts(self):
         return [discount.value for discount in self.set_discounts()]
 
     def lots(self):
-        lots = {bingo.lot for bingo in self.bingo_items.all()}
-        return sorted(lots, key=attrgetter('id'))
+        return self._matrix[0]
 
     def amounts(self):
-        lots = self.lots()
-        discounts = self.set_discounts()
-        amounts = []
-        for lot in lots:
-            row = []
-            for discount in discounts:
-                bi = self.bingo_items.get(discount=discount, lot=lot)
-                row.append(bi.amount)
-            amounts.append(row)
-        return amounts
+        return self._matrix[2]
+
+    @cached_property
+    @budgeted(1, 'BingoDiscount.amounts')
+    def _matrix(self):
+        """lots, discounts and the lot x discount amounts, loaded at once"""
+        if 'bingo_items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.bingo_items.all()
+        else:
+            items = self.bingo_items.select_related('lot', 'discount')
+        items = list(items)
+        lots = sorted({item.lot for item in items}, key=attrgetter('id'))
+        discounts = sorted({item.discount for item in items}, key=attrgetter('id'))
+        cells = {(item.lot_id, item.discount_id): item.amount for item in items}
+        amounts = [[cells[(lot.id, discount.id)] for discount in discounts]
+                   for lot in lots]
+        return lots, discounts, amounts
+
+    def clear_items_cache(self):
+        self.__dict__.pop('_matrix', None)
+        getattr(self, '_prefetched_objects_cache', {}).pop('bingo_items', None)
 
 
 class Discount(models.Model):
@@ -1,8 +1,14 @@
-from django.db import models
+from functools import cached_property
+
+from django.db import models, transaction
 
 from calculator.models.product import Product
+from calculator.queries import budgeted
 from calculator.utils.blackbox import convert_to_list, convert_to_dict,\
-    get_loyalty, get_rentability, LOT_CATEGORIES, open_box_n_times
+    get_loyalty, get_rentability, LOT_CATEGORIES
+from calculator.utils.distribution import BoxDistribution
+from calculator.utils.simulation import BoxSimulation, simulate_openings
+from calculator.utils.trajectories import simulate_trajectories
 
 
 class BlackBox(models.Model):
@@ -15,6 +21,8 @@ class BlackBox(models.Model):
         ordering = ('price',)
 
     @classmethod
+    @budgeted(len(LOT_CATEGORIES) + 5, 'BlackBox.from_json')
+    @transaction.atomic
     def from_json(cls, data, instance=None):
         lot_cost = data.get('lot_cost')
         product_ids = data.get('product_ids')
@@ -23,8 +31,7 @@ class BlackBox(models.Model):
         if lot_cost is not None:
             products = Product.get_mock_products(convert_to_list(lot_cost))
         else:
-            products = [Product.objects.get(pk=pk)
-                        for pk in convert_to_list(product_ids)]
+            products = Product.from_ids(convert_to_list(product_ids))
             prices = [product.price for product in products]
             lot_cost = convert_to_dict(prices)
 
@@ -48,6 +55,7 @@ class BlackBox(models.Model):
 
         cls.set_products_and_amounts(instance, products,
                                      convert_to_list(lot_amount))
+        instance.clear_items_cache()
         return instance
 
     @classmethod
@@ -58,10 +66,10 @@ class BlackBox(models.Model):
 
     @classmethod
     def set_products_and_amounts(cls, instance, products, amounts):
-        for product, amount in zip(products, amounts):
-            item = BlackBoxItem.objects.create(product=product,
-                                               black_box=instance, amount=amount)
-            item.save()
+        BlackBoxItem.objects.bulk_create([
+            BlackBoxItem(product=product, black_box=instance, amount=amount)
+            for product, amount in zip(products, amounts)
+        ])
 
     def __str__(self):
         return f'Box({self.name}, {self.price}, {self.loyalty}, {self.rentability})'
@@ -78,8 +86,20 @@ class BlackBox(models.Model):
         return [item.probability for item in self.sorted_items()]
 
     def sorted_items(self):
-        return sorted(list(self.items.all()),
-                      key=lambda item: item.product.price, reverse=True)
+        return self._item_snapshot
+
+    @cached_property
+    @budgeted(1, 'BlackBox.sorted_items')
+    def _item_snapshot(self):
+        if 'items' in getattr(self, '_prefetched_objects_cache', {}):
+            items = self.items.all()
+        else:
+            items = self.items.select_related('product')
+        return sorted(items, key=lambda item: item.product.price, reverse=True)
+
+    def clear_items_cache(self):
+        self.__dict__.pop('_item_snapshot', None)
+        getattr(self, '_prefetched_objects_cache', {}).pop('items', None)
 
     def get_category_mapping(self):
         return {key:value for key, value in zip(self.products(), LOT_CATEGORIES)}
@@ -101,9 +121,28 @@ class BlackBox(models.Model):
     def max_count_costly(self):
         return self.sorted_items()[0].amount
 
-    def mock_open(self, n):
+    def mock_open(self, n, seed=None):
         """get an item from the box n times"""
-        return open_box_n_times(n, self.amounts(), self.costs(), self.price)
+        items = simulate_openings(n, self.amounts(), self.costs(), self.price, seed=seed)
+        return [LOT_CATEGORIES[item] for item in items]
+
+    def simulation(self, seed=None):
+        return BoxSimulation(self.amounts(), self.costs(), self.price, seed=seed)
+
+    def simulate(self, runs, seed=None, **kwargs):
+        """statistics of runs independent openings of the box until it is empty"""
+        return simulate_trajectories(self.amounts(), self.costs(), self.price, runs, seed, **kwargs)
+
+    def distribution(self, n=None):
+        """exact probabilities of the first n openings, all of them by default"""
+        return BoxDistribution(self.amounts(), self.costs(), self.price, n)
+
+    @staticmethod
+    def unsaved_simulation(data):
+        """simulate a box described by validated data without touching the db"""
+        return BoxSimulation(convert_to_list(data['lot_amount']),
+                             convert_to_list(data['lot_cost']), data['price'],
+                             seed=data.get('seed'))
 
 
 class BlackBoxItem(models.Model):
@@ -0,0 +1,33 @@
+from math import ceil
+
+from django.db import connections, router
+
+
+def bulk_create_with_pks(model, objs, batch_size=None):
+    """
+    bulk_create that leaves primary keys set on the objects. Backends that
+    cannot return ids from a bulk insert (SQLite before Django 4) get one
+    INSERT per object instead.
+    """
+    connection = connections[router.db_for_write(model)]
+    if connection.features.can_return_rows_from_bulk_insert:
+        return model.objects.bulk_create(objs, batch_size=batch_size)
+    for obj in objs:
+        obj.save(force_insert=True)
+    return objs
+
+
+def insert_queries(model, count, batch_size=None, with_pks=False):
+    """
+    upper bound of the INSERT queries of bulk_create (bulk_create_with_pks
+    if with_pks) of count objects, batch_size of them per call
+    """
+    connection = connections[router.db_for_write(model)]
+    if with_pks and not connection.features.can_return_rows_from_bulk_insert:
+        return count
+    if count == 0:
+        return 0
+    batch_size = min(batch_size or count, count)
+    fields = [field for field in model._meta.concrete_fields if not field.primary_key]
+    query_size = min(batch_size, connection.ops.bulk_batch_size(fields, range(batch_size)))
+    return ceil(count / batch_size) * ceil(batch_size / query_size)
@@ -1,12 +1,30 @@
 from collections import defaultdict
-from random import sample
+from math import ceil
 
-from django.db import models
+import numpy as np
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count
 
+from calculator.models.bulk import insert_queries
 from calculator.models.product import Product
+from calculator.queries import budgeted, query_budget
+from calculator.utils.rng import make_rng, resolve_seed, sample_without_replacement
+
+
+TICKET_BATCH_SIZE = 5000
+LOTS_QUERY_BATCH_SIZE = 500
+FROM_JSON_QUERIES = 4
 
 
 class Lottery(models.Model):
+    DENSE = 'dense'
+    SPARSE = 'sparse'
+    STORAGE_CHOICES = (
+        (DENSE, 'every ticket is stored'),
+        (SPARSE, 'only winning tickets are stored'),
+    )
+
     name = models.CharField(max_length=127)
     write_off = models.DecimalField(decimal_places=2, max_digits=12)
     referral_coeff = models.PositiveIntegerField(blank=True, null=True)
@@ -16,6 +34,10 @@ class Lottery(models.Model):
     max_rentability = models.DecimalField(decimal_places=2, max_digits=3)
     total_cost = models.DecimalField(decimal_places=2, max_digits=12)
     discount = models.DecimalField(decimal_places=2, max_digits=3)
+    total_tickets = models.PositiveBigIntegerField(blank=True, null=True)
+    storage = models.CharField(max_length=6, choices=STORAGE_CHOICES, default=DENSE)
+    seed = models.CharField(max_length=39, blank=True, default='',
+                            help_text='seed of the lucky numbers, 128 bit integer')
 
     class Meta:
         ordering = ('-name',)
@@ -27,41 +49,97 @@ class Lottery(models.Model):
         return [lottery_item.product for lottery_item in self.lottery_items.all()]
 
     def ticket_amount(self):
+        if self.total_tickets is not None:
+            return self.total_tickets
         return self.lottery_items.all().count()
 
+    def get_ticket(self, number):
+        """product won by the ticket, None if the ticket does not win"""
+        if not 0 <= number < self.ticket_amount():
+            raise ValueError(f'Ticket {number} does not exist')
+        ticket = self.lottery_items.filter(number=number)\
+            .select_related('product').first()
+        return ticket.product if ticket is not None else None
+
+    def make_sparse(self):
+        """drop the losing tickets of a dense lottery"""
+        with transaction.atomic():
+            self.total_tickets = self.ticket_amount()
+            self.lottery_items.filter(product__isnull=True).delete()
+            self.storage = self.SPARSE
+            self.save(update_fields=('total_tickets', 'storage'))
+
     @staticmethod
-    def lucky_numbers(data):
+    def lucky_numbers(data, rng):
+        """winning ticket numbers in ascending order and the lot index of each of them"""
         amounts = [lot['amount'] for lot in data.get('lots')]
-        numbers = sample(range(data['ticket_amount']), sum(amounts))
-        return numbers
+        numbers = sample_without_replacement(data['ticket_amount'], sum(amounts), rng)
+        lot_indices = rng.permutation(np.repeat(np.arange(len(amounts)), amounts))
+        return numbers, lot_indices
 
     @classmethod
     def from_json(cls, data, instance=None):
-        numbers = cls.lucky_numbers(data)
-        lots = data.pop('lots')
-        ticket_amount = data.pop('ticket_amount')
-        products = Product.get_mock_products([lot['price'] for lot in lots])
-        if instance is None:
-            instance = Lottery.objects.create(**data)
-        else:
-            instance = cls.set_properties(instance, **data)
-            instance.lottery_items.all().delete()
+        with query_budget(cls.from_json_queries(data, instance), 'Lottery.from_json'):
+            seed = data.get('seed')
+            seed = resolve_seed(int(seed) if seed not in (None, '') else None)
+            data['seed'] = str(seed)
+            numbers, lot_indices = cls.lucky_numbers(data, make_rng(seed))
+            lots = data.pop('lots')
+            ticket_amount = data.pop('ticket_amount')
+            data['total_tickets'] = ticket_amount
+            with transaction.atomic():
+                products = Product.get_mock_products([lot['price'] for lot in lots])
+                if instance is None:
+                    instance = Lottery.objects.create(**data)
+                else:
+                    instance = cls.set_properties(instance, **data)
+                    instance.lottery_items.all().delete()
+
+                cls.set_tickets(instance, ticket_amount, products, numbers, lot_indices)
+            instance.__dict__.pop('_lots', None)
+            return instance
 
-        cls.set_tickets(instance, ticket_amount, lots, products, numbers)
-        return instance
+    @classmethod
+    def from_json_queries(cls, data, instance=None):
+        """mock products, tickets in batches and a few more for the lottery itself"""
+        storage = data.get('storage') or (instance.storage if instance else cls.DENSE)
+        tickets = data['ticket_amount'] if storage == cls.DENSE\
+            else sum(lot['amount'] for lot in data['lots'])
+        batch_size = getattr(settings, 'LOTTERY_TICKET_BATCH_SIZE', TICKET_BATCH_SIZE)
+        return (FROM_JSON_QUERIES + insert_queries(Product, len(data['lots']), with_pks=True)
+                + insert_queries(Ticket, tickets, batch_size))
 
     @classmethod
-    def set_tickets(cls, instance, ticket_amount, lots, products, numbers):
-        tickets = [Ticket.objects.create(product=None, lottery=instance, number=i)
-                   for i in range(ticket_amount)]
-        products_for_amount = []
-        for product, lot in zip(products, lots):
-            products_for_amount.extend([product] * lot['amount'])
-        for product, number in zip(products_for_amount, numbers):
-            tickets[number].product = product
-        for ticket in tickets:
-            ticket.save()
-        return tickets
+    def set_tickets(cls, instance, ticket_amount, products, numbers, lot_indices):
+        """
+        numbers are the sorted winning tickets and lot_indices the lots they
+        win, losing tickets are only created for dense lotteries
+        """
+        batch_size = getattr(settings, 'LOTTERY_TICKET_BATCH_SIZE', TICKET_BATCH_SIZE)
+        if instance.storage == Lottery.SPARSE:
+            batches = cls.sparse_tickets(instance, products, numbers, lot_indices, batch_size)
+        else:
+            batches = cls.dense_tickets(instance, ticket_amount, products,
+                                        numbers, lot_indices, batch_size)
+        for batch in batches:
+            Ticket.objects.bulk_create(batch, batch_size=batch_size)
+
+    @staticmethod
+    def sparse_tickets(instance, products, numbers, lot_indices, batch_size):
+        for start in range(0, len(numbers), batch_size):
+            yield [Ticket(product=products[lot], lottery=instance, number=number)
+                   for number, lot in zip(numbers[start:start + batch_size].tolist(),
+                                          lot_indices[start:start + batch_size].tolist())]
+
+    @staticmethod
+    def dense_tickets(instance, ticket_amount, products, numbers, lot_indices, batch_size):
+        for start in range(0, ticket_amount, batch_size):
+            end = min(start + batch_size, ticket_amount)
+            batch = [Ticket(lottery=instance, number=number) for number in range(start, end)]
+            lo, hi = np.searchsorted(numbers, [start, end])
+            for number, lot in zip(numbers[lo:hi].tolist(), lot_indices[lo:hi].tolist()):
+                batch[number - start].product = products[lot]
+            yield batch
 
     @classmethod
     def set_properties(cls, instance, **kwargs):
@@ -69,16 +147,37 @@ class Lottery(models.Model):
             setattr(instance, key, value)
         return instance
 
+    @budgeted(1)
     def lots(self):
-        counter = defaultdict(int)
-        for ticket in self.lottery_items.all():
-            if ticket.product:
-                product = ticket.product
-                counter[(product.id, product.price)] += 1
-        products = []
-        for id_price, amount in counter.items():
-            id_, price = id_price
-            products.append({'amount': amount, 'price': price})
+        if hasattr(self, '_lots'):
+            return self._lots
+        return self.group_lots(self.winning_counts(self.lottery_items.all()))
+
+    @classmethod
+    def prefetch_lots(cls, lotteries):
+        """compute lots() of many lotteries with one GROUP BY query per batch"""
+        lotteries = list(lotteries)
+        rows = defaultdict(list)
+        with query_budget(ceil(len(lotteries) / LOTS_QUERY_BATCH_SIZE), 'Lottery.prefetch_lots'):
+            for start in range(0, len(lotteries), LOTS_QUERY_BATCH_SIZE):
+                batch = lotteries[start:start + LOTS_QUERY_BATCH_SIZE]
+                tickets = Ticket.objects.filter(lottery__in=batch)
+                for row in cls.winning_counts(tickets, 'lottery_id'):
+                    rows[row['lottery_id']].append(row)
+        for lottery in lotteries:
+            lottery._lots = cls.group_lots(rows[lottery.id])
+        return lotteries
+
+    @staticmethod
+    def winning_counts(tickets, *fields):
+        return tickets.filter(product__isnull=False)\
+            .values(*fields, 'product_id', 'product__price')\
+            .annotate(amount=Count('id')).order_by()
+
+    @staticmethod
+    def group_lots(rows):
+        products = [{'amount': row['amount'], 'price': row['product__price']}
+                    for row in rows]
         return sorted(products, key=lambda x: x['price'], reverse=True)
 
     def truncated_name(self):
@@ -93,4 +192,9 @@ class Ticket(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE,
                                 related_name='lottery_items',
                                 blank=True, null=True)
-    number = models.PositiveIntegerField()
+    number = models.PositiveBigIntegerField()
+
+    class Meta:
+        indexes = (
+            models.Index(fields=('lottery', 'number')),
+        )
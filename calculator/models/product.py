@@ -1,4 +1,12 @@
-from django.db import models
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.db import models, router, transaction
+
+from calculator.models.bulk import bulk_create_with_pks
+
+
+MOCK_NAME = 'mock'
 
 
 class Product(models.Model):
@@ -7,14 +15,74 @@ class Product(models.Model):
 
     @classmethod
     def get_mock_products(cls, costs):
-        products = [cls.objects.create(name='mock', price=price)
-                    for price in costs]
-        for product in products:
-            product.save()
+        """
+        mock products with the given prices, taken from the pool of earlier
+        ones and created only when the pool has none. A price repeated in
+        costs gets distinct products, so the lots of a lottery stay apart.
+        Run it in the transaction that references the products: the pool rows
+        stay locked until then and the sweep skips them.
+        """
+        field = cls._meta.get_field('price')
+        prices = [field.to_python(cost).quantize(Decimal(10) ** -field.decimal_places)
+                  for cost in costs]
+        pool = defaultdict(list)
+        pool_products = cls.objects.filter(name=MOCK_NAME, price__in=set(prices))
+        for product in pool_products.order_by('pk').select_for_update():
+            pool[product.price].append(product)
+        taken = Counter()
+        products, missing = [], []
+        for price in prices:
+            if taken[price] < len(pool[price]):
+                product = pool[price][taken[price]]
+            else:
+                product = cls(name=MOCK_NAME, price=price)
+                missing.append(product)
+            taken[price] += 1
+            products.append(product)
+        bulk_create_with_pks(cls, missing)
         return products
 
+    @classmethod
+    def from_ids(cls, ids):
+        """products in the order of ids, in one query unless they are products already"""
+        if all(isinstance(pk, cls) for pk in ids):
+            return list(ids)
+        products = cls.objects.in_bulk(ids)
+        if len(products) < len(set(ids)):
+            raise cls.DoesNotExist(f'No products for some of {ids}')
+        return [products[pk] for pk in ids]
+
+    @classmethod
+    def unreferenced_mocks(cls):
+        return cls.objects.filter(name=MOCK_NAME, items__isnull=True,
+                                  lottery_items__isnull=True)
+
+    @classmethod
+    def delete_unreferenced_mocks(cls, batch_size=1000, max_batches=None):
+        """delete mock products no box or lottery uses, batch_size per query"""
+        db = router.db_for_write(cls)
+        deleted = batches = 0
+        while max_batches is None or batches < max_batches:
+            with transaction.atomic(using=db):
+                # products locked by a box or lottery being saved are skipped
+                ids = [product.pk for product in cls.unreferenced_mocks()
+                       .select_for_update(skip_locked=True, of=('self',))
+                       .only('pk')[:batch_size]]
+                if not ids:
+                    break
+                # the references are checked again, the locked rows cannot gain
+                # a box item or ticket before the batch commits, so the cascade
+                # has nothing to delete
+                _, counts = cls.unreferenced_mocks().filter(pk__in=ids).delete()
+                deleted += counts.get(cls._meta.label, 0)
+            batches += 1
+        return deleted
+
     class Meta:
         ordering = ('price',)
+        indexes = (
+            models.Index(fields=('name', 'price')),
+        )
 
     def __str__(self):
         return self.name
@@ -0,0 +1,18 @@
+from rest_framework.pagination import CursorPagination
+
+
+class OptionalCursorPagination(CursorPagination):
+    """
+    Cursor pagination, newest first, for clients that ask for it with cursor
+    or page_size. Without them the list is returned whole as before.
+    """
+    page_size = 100
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+    ordering = '-id'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        params = request.query_params
+        if self.cursor_query_param not in params and self.page_size_query_param not in params:
+            return None
+        return super().paginate_queryset(queryset, request, view)
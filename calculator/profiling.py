@@ -0,0 +1,172 @@
+import threading
+import tracemalloc
+from collections import deque
+from contextlib import ExitStack
+from time import perf_counter
+from typing import Dict
+
+import numpy as np
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connections
+from django.dispatch import receiver
+
+from calculator.utils.timing import Profile, activate, deactivate
+
+
+DEFAULTS = {
+    'ENABLED': False,
+    'TRACEMALLOC': False,
+    'WINDOW': 1000,
+}
+
+BUCKETS_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+
+def profiling_options() -> Dict:
+    return {**DEFAULTS, **getattr(settings, 'PROFILING', {})}
+
+
+class ProfilingMiddleware:
+    """
+    Wall time, SQL queries and timing spans of every request, optionally the
+    allocation peak (PROFILING['TRACEMALLOC'], slow and approximate when
+    requests run concurrently). Kept in a rolling per-endpoint histogram and
+    sent in the Server-Timing header when DEBUG is on or the user is staff.
+    Off unless PROFILING['ENABLED'] is set.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        options = profiling_options()
+        if not options['ENABLED']:
+            return self.get_response(request)
+        profile = Profile()
+        token = activate(profile)
+        if options['TRACEMALLOC']:
+            start_tracing()
+        start = perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(profile.record_query))
+                response = self.get_response(request)
+        finally:
+            profile.total = perf_counter() - start
+            deactivate(token)
+        if options['TRACEMALLOC']:
+            profile.alloc_peak = tracemalloc.get_traced_memory()[1]
+        if settings.DEBUG or is_staff(request):
+            response['Server-Timing'] = server_timing(profile)
+        get_request_histogram().add(endpoint(request), profile)
+        return response
+
+
+def start_tracing():
+    if not tracemalloc.is_tracing():
+        tracemalloc.start()
+    if hasattr(tracemalloc, 'reset_peak'):
+        tracemalloc.reset_peak()
+    else:
+        tracemalloc.clear_traces()
+
+
+def is_staff(request) -> bool:
+    user = getattr(request, 'user', None)
+    return bool(user is not None and user.is_staff)
+
+
+def endpoint(request) -> str:
+    """unresolved paths share one name so that the histogram stays bounded"""
+    match = request.resolver_match
+    return f'{request.method} {match.view_name if match else "<unmatched>"}'
+
+
+def server_timing(profile: Profile) -> str:
+    metrics = [f'total;dur={profile.total * 1000:.2f}',
+               f'db;dur={profile.sql_time * 1000:.2f};desc="{profile.queries} queries"']
+    metrics.extend(f'{name};dur={duration * 1000:.2f}'
+                   for name, duration in profile.spans.items())
+    return ', '.join(metrics)
+
+
+class RequestHistogram:
+    """the last window profiles of every endpoint"""
+    def __init__(self, window: int):
+        self.window = window
+        self.samples = {}
+        self.lock = threading.Lock()
+
+    def add(self, name: str, profile: Profile):
+        sample = {
+            'total': profile.total * 1000,
+            'db': profile.sql_time * 1000,
+            'queries': profile.queries,
+            'spans': {key: value * 1000 for key, value in profile.spans.items()},
+            'alloc_peak': profile.alloc_peak,
+        }
+        with self.lock:
+            self.samples.setdefault(name, deque(maxlen=self.window)).append(sample)
+
+    def clear(self):
+        with self.lock:
+            self.samples.clear()
+
+    def stats(self) -> Dict:
+        with self.lock:
+            samples = {name: list(values) for name, values in self.samples.items()}
+        return {name: endpoint_stats(values) for name, values in samples.items()}
+
+
+def endpoint_stats(samples) -> Dict:
+    spans = {}
+    for sample in samples:
+        for name, duration in sample['spans'].items():
+            spans.setdefault(name, []).append(duration)
+    peaks = [sample['alloc_peak'] for sample in samples if sample['alloc_peak'] is not None]
+    data = {
+        'count': len(samples),
+        'total_ms': summary([sample['total'] for sample in samples], buckets=True),
+        'db_ms': summary([sample['db'] for sample in samples]),
+        'queries': summary([sample['queries'] for sample in samples]),
+        'spans_ms': {name: summary(values) for name, values in spans.items()},
+    }
+    if peaks:
+        data['alloc_peak_bytes'] = summary(peaks)
+    return data
+
+
+def summary(values, buckets=False) -> Dict:
+    values = np.asarray(values, dtype=float)
+    p50, p90, p99 = np.percentile(values, (50, 90, 99))
+    data = {
+        'mean': float(values.mean()),
+        'p50': float(p50),
+        'p90': float(p90),
+        'p99': float(p99),
+        'max': float(values.max()),
+    }
+    if buckets:
+        counts = np.bincount(np.searchsorted(BUCKETS_MS, values),
+                             minlength=len(BUCKETS_MS) + 1)
+        labels = [f'<={bound}' for bound in BUCKETS_MS] + [f'>{BUCKETS_MS[-1]}']
+        data['histogram'] = dict(zip(labels, counts.tolist()))
+    return data
+
+
+_request_histogram = None
+
+
+def get_request_histogram() -> RequestHistogram:
+    global _request_histogram
+    if _request_histogram is None:
+        _request_histogram = RequestHistogram(profiling_options()['WINDOW'])
+    return _request_histogram
+
+
+@receiver(setting_changed)
+def reset_request_histogram(setting, **kwargs):
+    global _request_histogram
+    if setting == 'PROFILING':
+        _request_histogram = None
@@ -0,0 +1,92 @@
+"""
+Query budgets: the most SQL queries a block of code may run. Going over the
+budget raises QueryBudgetExceeded when QUERY_BUDGETS_ENFORCE is on (DEBUG by
+default) and logs a warning otherwise. Budgets nest, a query counts against
+every enclosing budget. A nested budget adds its limit to the budgets around
+it once per name, so a view budget holds the view's own queries plus what its
+model paths declare, and a budgeted call repeated per row still shows up.
+"""
+import logging
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Dict, List, Optional
+
+from django.conf import settings
+from django.db import connections
+
+
+logger = logging.getLogger(__name__)
+
+_active_counters = ContextVar('query_counters', default=())
+
+
+class QueryBudgetExceeded(Exception):
+    pass
+
+
+class QueryCounter:
+    def __init__(self):
+        self.queries: List[str] = []
+        self.nested: Dict[str, int] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        """django execute_wrapper hook"""
+        if self in _active_counters.get():
+            self.queries.append(sql)
+        return execute(sql, params, many, context)
+
+    def __len__(self):
+        return len(self.queries)
+
+    def allow(self, name: str, limit: int):
+        """let a nested budget spend its limit, once per name"""
+        self.nested[name] = max(self.nested.get(name, 0), limit)
+
+    def limit(self, limit: int) -> int:
+        return limit + sum(self.nested.values())
+
+
+def enforce_query_budgets() -> bool:
+    return getattr(settings, 'QUERY_BUDGETS_ENFORCE', settings.DEBUG)
+
+
+def check_budget(name: str, limit: int, counter: QueryCounter):
+    limit = counter.limit(limit)
+    if len(counter) <= limit:
+        return
+    message = f'{name} ran {len(counter)} queries, the budget is {limit}'
+    if enforce_query_budgets():
+        queries = '\n'.join(counter.queries)
+        raise QueryBudgetExceeded(f'{message}:\n{queries}')
+    logger.warning(message)
+
+
+@contextmanager
+def query_budget(limit: int, name: str = 'block'):
+    counter = QueryCounter()
+    enclosing = _active_counters.get()
+    for outer in enclosing:
+        outer.allow(name, limit)
+    token = _active_counters.set(enclosing + (counter,))
+    try:
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(counter))
+            yield counter
+    finally:
+        _active_counters.reset(token)
+    check_budget(name, limit, counter)
+
+
+def budgeted(limit: int, name: Optional[str] = None):
+    """decorator form of query_budget, named after the function by default"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with query_budget(limit, label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,13 +1,14 @@
 from rest_framework import serializers
 
 from calculator.models.bingodiscount import BingoDiscount
+from calculator.serializers.mixins import SparseFieldsMixin
 
 
 class Matrix(serializers.ListField):
     child = serializers.IntegerField(min_value=0)
 
 
-class BingoSerializer(serializers.ModelSerializer):
+class BingoSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     prices = serializers.ListField(child=serializers.DecimalField(min_value=0,
                                                                   max_digits=12, decimal_places=2))
     discounts = serializers.ListSerializer(child=serializers.DecimalField(min_value=0,
@@ -1,8 +1,20 @@
+from decimal import Decimal
+
+from django.conf import settings
 from rest_framework import serializers
 
 from calculator.models.blackbox import BlackBox
 from calculator.models.product import Product
+from calculator.serializers.fields import SeedField
+from calculator.serializers.mixins import SparseFieldsMixin
+from calculator.utils.blackbox import PROFIT, LOYALTY
+from calculator.utils.distribution import BoxDistribution
+
 
+OUTPUT_FORMATS = ('list', 'ndjson', 'rle', 'index', 'aggregate')
+GRID_MAX_SIZE = 10 ** 6
+SIMULATE_MAX_RUNS = 10 ** 5
+DISTRIBUTION_MAX_SIZE = 10 ** 7
 
 class LotAmountSerializer(serializers.Serializer):
     costly = serializers.IntegerField(min_value=1)
@@ -37,7 +49,7 @@ class ProductIdsSerializer(serializers.Serializer):
         return attrs
 
 
-class BlackBoxSerializer(serializers.ModelSerializer):
+class BlackBoxSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     lot_amount = LotAmountSerializer(
         help_text='{costly: int, middle: int, cheap: int}'
     )
@@ -80,8 +92,89 @@ class CalculateSerializer(serializers.Serializer):
     black_box_cost = serializers.DecimalField(min_value=0, max_digits=7, decimal_places=2)
 
 
+class RangeSerializer(serializers.Serializer):
+    start = serializers.DecimalField(max_digits=9, decimal_places=2)
+    stop = serializers.DecimalField(max_digits=9, decimal_places=2)
+    step = serializers.DecimalField(min_value=Decimal('0.01'), max_digits=9, decimal_places=2)
+
+    def validate(self, attrs):
+        if attrs['start'] > attrs['stop']:
+            raise serializers.ValidationError('start должен быть не больше stop')
+        if (attrs['stop'] - attrs['start']) / attrs['step'] >= GRID_MAX_SIZE:
+            raise serializers.ValidationError('Слишком много значений')
+        return attrs
+
+
+class GridAxisField(serializers.Field):
+    """a list of values or a {start, stop, step} range, stop included"""
+    def __init__(self, min_value=None, max_value=None, **kwargs):
+        super().__init__(**kwargs)
+        self.value_field = serializers.DecimalField(min_value=min_value, max_value=max_value,
+                                                    max_digits=9, decimal_places=2)
+
+    def to_internal_value(self, data):
+        if isinstance(data, dict):
+            serializer = RangeSerializer(data=data)
+            serializer.is_valid(raise_exception=True)
+            start, stop, step = (serializer.validated_data[key]
+                                 for key in ('start', 'stop', 'step'))
+            data = [start + i * step for i in range(int((stop - start) / step) + 1)]
+        elif not isinstance(data, list) or not data:
+            raise serializers.ValidationError(
+                'Ожидается непустой список или {start, stop, step}'
+            )
+        return [float(self.value_field.run_validation(value)) for value in data]
+
+    def to_representation(self, value):
+        return value
+
+
+class CalculateGridSerializer(serializers.Serializer):
+    lot_cost = LotCostSerializer(help_text='{costly: float, middle: float, cheap: float}')
+    costly_amount = serializers.IntegerField(min_value=1)
+    black_box_cost = GridAxisField(min_value=0, help_text='[...] или {start, stop, step}')
+    rentability = GridAxisField(min_value=0, max_value=1, required=False,
+                                default=[PROFIT], help_text='[...] или {start, stop, step}')
+    loyalty = GridAxisField(min_value=0, max_value=1, required=False,
+                            default=[LOYALTY], help_text='[...] или {start, stop, step}')
+
+    def validate(self, attrs):
+        size = len(attrs['black_box_cost']) * len(attrs['rentability']) * len(attrs['loyalty'])
+        if size > GRID_MAX_SIZE:
+            raise serializers.ValidationError(
+                f'Слишком большая сетка: не более {GRID_MAX_SIZE} точек'
+            )
+        return attrs
+
+
 class MockOpenSerializer(serializers.Serializer):
     n = serializers.IntegerField(min_value=1, help_text='Количество открытий')
+    output = serializers.ChoiceField(
+        choices=OUTPUT_FORMATS, default='list',
+        help_text='list, ndjson, rle, index или aggregate'
+    )
+    seed = SeedField(required=False)
+
+
+class DistributionSerializer(serializers.Serializer):
+    n = serializers.IntegerField(min_value=1, required=False,
+                                 help_text='Количество открытий, по умолчанию до опустошения')
+
+    def validate(self, attrs):
+        """the box comes in the context as its amounts"""
+        size = BoxDistribution.size(self.context['amounts'], attrs.get('n'))
+        max_size = getattr(settings, 'DISTRIBUTION_MAX_SIZE', DISTRIBUTION_MAX_SIZE)
+        if size > max_size:
+            raise serializers.ValidationError(
+                f'Слишком большая коробка: не более {max_size} состояний на все открытия'
+            )
+        return attrs
+
+
+class SimulateSerializer(serializers.Serializer):
+    runs = serializers.IntegerField(min_value=1, max_value=SIMULATE_MAX_RUNS,
+                                    help_text='Количество независимых открытий коробки до конца')
+    seed = SeedField(required=False)
 
 
 class MockOpenUnsavedSerializer(serializers.ModelSerializer):
@@ -92,7 +185,12 @@ class MockOpenUnsavedSerializer(serializers.ModelSerializer):
         help_text='{costly: int, middle: int, cheap: int}'
     )
     n = serializers.IntegerField(min_value=1, help_text='Количество открытий')
+    output = serializers.ChoiceField(
+        choices=OUTPUT_FORMATS, default='list',
+        help_text='list, ndjson, rle, index или aggregate'
+    )
+    seed = SeedField(required=False)
 
     class Meta:
         model = BlackBox
-        fields = ('name', 'price', 'lot_cost', 'lot_amount', 'n',)
+        fields = ('name', 'price', 'lot_cost', 'lot_amount', 'n', 'output', 'seed',)
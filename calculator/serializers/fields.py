@@ -0,0 +1,20 @@
+from rest_framework import serializers
+
+
+MAX_SEED = 2 ** 128 - 1
+
+
+class SeedField(serializers.Field):
+    """a 128 bit seed, a string in the output since JS can't hold it as a number"""
+    default_error_messages = {
+        'invalid': 'Ожидается целое число от 0 до 2^128 - 1',
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, bool) or not isinstance(data, (int, str)) \
+                or not str(data).isdigit() or int(data) > MAX_SEED:
+            self.fail('invalid')
+        return int(data)
+
+    def to_representation(self, value):
+        return str(value) if value not in (None, '') else None
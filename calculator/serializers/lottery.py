@@ -1,6 +1,15 @@
+from django.db import models
 from rest_framework import serializers
 
 from calculator.models.lottery import Lottery
+from calculator.serializers.fields import SeedField
+from calculator.serializers.mixins import SparseFieldsMixin
+from calculator.utils.lottery import LotterySession, LotteryOptimizer
+
+
+INTEGER_FIELDS = ('amount', 'ticket_amount', 'referral_coeff')
+# the ticket numbers and the total are stored as 64 bit integers
+MAX_TICKET_AMOUNT = 2 ** 63 - 1
 
 
 class LotSerializer(serializers.Serializer):
@@ -8,17 +17,27 @@ class LotSerializer(serializers.Serializer):
     price = serializers.DecimalField(min_value=0, max_digits=7, decimal_places=2)
 
 
-class LotterySerializer(serializers.ModelSerializer):
+class LotteryListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, models.Manager) else data
+        if 'lots' in self.child.fields:
+            iterable = Lottery.prefetch_lots(iterable)
+        return super().to_representation(iterable)
+
+
+class LotterySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     lots = LotSerializer(many=True)
-    ticket_amount = serializers.IntegerField(min_value=0)
+    ticket_amount = serializers.IntegerField(min_value=0, max_value=MAX_TICKET_AMOUNT)
+    seed = SeedField(required=False)
 
     class Meta:
         model = Lottery
         fields = ('name', 'lots', 'write_off', 'referral_coeff', 'ticket_amount',
                   'total_cost', 'ticket_price', 'min_profit',
                   'min_rentability', 'max_rentability', 'discount',
-                  'truncated_name', 'id')
+                  'truncated_name', 'storage', 'seed', 'id')
         read_only_fields = ('truncated_name', 'id')
+        list_serializer_class = LotteryListSerializer
 
 
 class CalculateSerializer(serializers.Serializer):
@@ -29,3 +48,39 @@ class CalculateSerializer(serializers.Serializer):
     ticket_price = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
     discount = serializers.DecimalField(max_digits=3, decimal_places=2,
                                         min_value=0, max_value=1, required=False)
+
+
+class OptimizeSerializer(serializers.Serializer):
+    lots = LotSerializer(many=True)
+    write_off = serializers.DecimalField(max_digits=12, decimal_places=2, min_value=0)
+    referral_coeff = serializers.IntegerField(default=0)
+    discount = serializers.DecimalField(max_digits=3, decimal_places=2,
+                                        min_value=0, max_value=1, default=0)
+    objective = serializers.ChoiceField(choices=LotteryOptimizer.OBJECTIVES, default='min_profit')
+    min_rentability = serializers.DecimalField(max_digits=6, decimal_places=2, default=0)
+    min_ticket_amount = serializers.IntegerField(min_value=0, required=False)
+    max_ticket_amount = serializers.IntegerField(min_value=1, required=False)
+    min_ticket_price = serializers.DecimalField(max_digits=12, decimal_places=2,
+                                                min_value=0, required=False)
+    max_ticket_price = serializers.DecimalField(max_digits=12, decimal_places=2,
+                                                min_value=10, required=False)
+
+
+class LotteryChangeSerializer(serializers.Serializer):
+    field = serializers.ChoiceField(choices=LotterySession.LOT_FIELDS + LotterySession.PARAMS)
+    lot = serializers.IntegerField(min_value=0, required=False)
+    op = serializers.ChoiceField(choices=('set', 'add'), default='set')
+    value = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+    def validate(self, attrs):
+        if attrs['field'] in LotterySession.LOT_FIELDS and 'lot' not in attrs:
+            raise serializers.ValidationError({'lot': 'Укажите номер лота.'})
+        if attrs['field'] in INTEGER_FIELDS:
+            if attrs['value'] != int(attrs['value']):
+                raise serializers.ValidationError({'value': 'Значение должно быть целым.'})
+            attrs['value'] = int(attrs['value'])
+        return attrs
+
+
+class LotterySessionSerializer(serializers.Serializer):
+    changes = LotteryChangeSerializer(many=True)
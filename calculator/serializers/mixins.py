@@ -0,0 +1,25 @@
+from typing import Optional, Set
+
+
+FIELDS_QUERY_PARAM = 'fields'
+
+
+def requested_fields(request) -> Optional[Set[str]]:
+    """names given in ?fields=a,b on a read, None if every field is wanted"""
+    if request is None or request.method not in ('GET', 'HEAD'):
+        return None
+    value = request.query_params.get(FIELDS_QUERY_PARAM)
+    if not value:
+        return None
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+class SparseFieldsMixin:
+    """drops the fields the client did not ask for with ?fields=, unknown names are ignored"""
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        fields = requested_fields(self.context.get('request'))
+        if fields is None:
+            return
+        for name in set(self.fields) - fields:
+            self.fields.pop(name)
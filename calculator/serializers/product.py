@@ -1,9 +1,10 @@
 from rest_framework import serializers
 
 from calculator.models.product import Product
+from calculator.serializers.mixins import SparseFieldsMixin
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Product
         fields = ('name', 'price', 'url',)
@@ -295,7 +295,7 @@ INIT_DISCOUNT_DATA = [
 
 DIC_DATA = [
     ({'prices': [570, 1218, 1721], 'discounts': [0.1, 0.17, 0.71, 0.51, 0.58, 0.28, 0.77, 0.91, 0.02, 0.48], 'budget': 46536, 'lucky_participants': 87, 'usage_probability': 1, 'unlucky_participants': None, 'budget_distribution': None},
-     {'amounts': [[9, 4, 3, 2, 2, 2, 1, 2, 1, 22], [4, 2, 1, 1, 1, 1, 0, 1, 1, 10], [4, 1, 1, 1, 1, 0, 1, 1, 0, 7]], 'participants_per_lot': [48, 22, 17], 'unlucky_participants': 0, 'total_participants': 87, 'budget_distribution': [0.33, 0.33, 0.34], 'expected_budget': 45133.97, 'message': '', 'success': True, 'lucky_participants': 87}),
+     {'amounts': [[9, 4, 3, 2, 2, 2, 1, 2, 1, 22], [5, 2, 1, 1, 1, 1, 1, 0, 1, 10], [3, 1, 1, 1, 1, 0, 1, 0, 1, 7]], 'participants_per_lot': [48, 23, 16], 'unlucky_participants': 0, 'total_participants': 87, 'budget_distribution': [0.33, 0.33, 0.34], 'expected_budget': 45069, 'message': '', 'success': True, 'lucky_participants': 87}),
 ]
 
 
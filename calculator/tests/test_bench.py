@@ -0,0 +1,45 @@
+import json
+import os
+import tempfile
+from io import StringIO
+
+from django.core.management import call_command, CommandError
+from django.test import SimpleTestCase
+
+from calculator.benchmarks.suite import compare, select
+
+
+def report(**times):
+    return {'results': [{'scenario': name, 'param': '10', 'min': time}
+                        for name, time in times.items()]}
+
+
+class BenchTest(SimpleTestCase):
+    def test_compare(self):
+        rows = compare(report(a=1.0, b=1.0, c=1.0), report(a=1.1, b=1.5, d=9.0), threshold=0.2)
+        self.assertEqual([row['key'] for row in rows], ['a[10]', 'b[10]'])
+        self.assertEqual([row['regression'] for row in rows], [False, True])
+        self.assertAlmostEqual(rows[1]['ratio'], 1.5)
+
+    def test_select(self):
+        call_command('bench', list=True, stdout=StringIO())
+        self.assertTrue(select(['util.bingo']))
+        self.assertTrue(all(s.name.startswith('util.bingo') for s in select(['util.bingo'])))
+        self.assertTrue(all(s.layer == 'api' for s in select(layers=['api'])))
+
+    def test_command(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'bench.json')
+            call_command('bench', 'util.bingo', quick=True, repeat=1, output=path,
+                         stderr=StringIO())
+            with open(path) as f:
+                data = json.load(f)
+            self.assertEqual({r['scenario'] for r in data['results']},
+                             {'util.bingo.mini', 'util.bingo.discount'})
+            for result in data['results']:
+                result['min'] /= 100
+            with open(path, 'w') as f:
+                json.dump(data, f)
+            with self.assertRaises(CommandError):
+                call_command('bench', 'util.bingo', quick=True, repeat=1, output=path,
+                             compare=path, stderr=StringIO())
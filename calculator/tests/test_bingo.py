@@ -0,0 +1,103 @@
+from copy import deepcopy
+from decimal import Decimal
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from calculator.models.bingodiscount import BingoDiscount, DiscountProduct,\
+    Discount, Lot
+
+
+def bingo_data(n, k, name='Bingo'):
+    return {
+        'name': name,
+        'prices': [100 * (i + 1) for i in range(n)],
+        'discounts': [round(0.05 * (j + 1), 2) for j in range(k)],
+        'budget': 10000,
+        'budget_distribution': [round(1 / n, 2)] * n,
+        'expected_budget': 9000,
+        'participants_per_lot': [k] * n,
+        'total_participants': 100,
+        'unlucky_participants': 0.1,
+        'lucky_participants': n * k,
+        'usage_probability': 0.9,
+        'amounts': [[i + j for j in range(k)] for i in range(n)],
+    }
+
+
+class BingoTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.data = bingo_data(3, 2)
+        cls.other_data = bingo_data(2, 4)
+
+    def tearDown(self):
+        BingoDiscount.objects.all().delete()
+
+    def test_post(self):
+        response = self.client.post(reverse('bingodiscount-list'), data=self.data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        bingo = BingoDiscount.objects.get()
+        self.assertEqual(bingo.prices(), [100, 200, 300])
+        self.assertEqual(bingo.discounts(), [Decimal('0.05'), Decimal('0.1')])
+        self.assertEqual(bingo.participants_per_lot(), [2, 2, 2])
+        self.assertEqual(bingo.amounts(), self.data['amounts'])
+
+    def test_put(self):
+        self.client.post(reverse('bingodiscount-list'), data=self.data, format='json')
+        pk = BingoDiscount.objects.get().pk
+        response = self.client.put(reverse('bingodiscount-detail', args=[pk]),
+                                   data=self.other_data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        bingo = BingoDiscount.objects.get(pk=pk)
+        self.assertEqual(bingo.prices(), [100, 200])
+        self.assertEqual(bingo.amounts(), self.other_data['amounts'])
+        self.assertEqual(DiscountProduct.objects.count(), 8)
+        self.assertEqual(Lot.objects.count(), 2)
+        self.assertEqual(Discount.objects.count(), 4)
+
+    def test_delete(self):
+        self.client.post(reverse('bingodiscount-list'), data=self.data, format='json')
+        pk = BingoDiscount.objects.get().pk
+        response = self.client.delete(reverse('bingodiscount-detail', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(DiscountProduct.objects.exists())
+        self.assertFalse(Lot.objects.exists())
+        self.assertFalse(Discount.objects.exists())
+
+    def test_get(self):
+        self.client.post(reverse('bingodiscount-list'), data=self.data, format='json')
+        pk = BingoDiscount.objects.get().pk
+        response = self.client.get(reverse('bingodiscount-detail', args=[pk]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        for key in ('prices', 'discounts', 'budget_distribution', 'amounts'):
+            self.assertEqual(data[key], self.data[key])
+
+    def test_create_query_count(self):
+        with CaptureQueriesContext(connection) as queries:
+            BingoDiscount.from_json(bingo_data(20, 10))
+        if connection.features.can_return_rows_from_bulk_insert:
+            self.assertLessEqual(len(queries), 10)
+        else:
+            self.assertLessEqual(len(queries), 20 + 10 + 10)
+        self.assertEqual(DiscountProduct.objects.count(), 200)
+
+    def test_list_query_count(self):
+        BingoDiscount.from_json(deepcopy(self.data))
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('bingodiscount-list'))
+        self.assertEqual(len(response.json()), 1)
+        for i in range(3):
+            BingoDiscount.from_json(bingo_data(20, 10, name=f'Bingo {i}'))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('bingodiscount-list'))
+        data = response.json()
+        self.assertEqual(len(data), 4)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), 2)
+        self.assertEqual(data[1]['amounts'], bingo_data(20, 10)['amounts'])
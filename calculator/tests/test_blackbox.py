@@ -1,6 +1,8 @@
 from copy import deepcopy
 from decimal import Decimal
 
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -140,3 +142,26 @@ class BlackBoxTest(APITestCase):
         bb = BlackBox.from_json(data)
         bb.save()
         self.assertEqual(bb.truncated_name(), '123456789012...')
+
+    def test_list_query_count_does_not_depend_on_box_count(self):
+        for _ in range(3):
+            BlackBox.from_json(deepcopy(self.data))
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('blackbox-list'))
+        self.assertEqual(len(response.json()), 3)
+        for _ in range(7):
+            BlackBox.from_json(deepcopy(self.data))
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('blackbox-list'))
+        self.assertEqual(len(response.json()), 10)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), 2)
+
+    def test_items_cache_is_cleared_on_update(self):
+        bb = BlackBox.from_json(deepcopy(self.data))
+        self.assertEqual(bb.amounts(), [1, 3, 6])
+        bb = BlackBox.from_json(deepcopy(self.other_data), instance=bb)
+        self.assertEqual(bb.amounts(), [2, 3, 5])
+        with self.assertNumQueries(0):
+            bb.lot_cost()
+            bb.max_count_costly()
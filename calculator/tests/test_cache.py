@@ -0,0 +1,104 @@
+import tempfile
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from calculator.cache import CalculationCache, get_calculation_cache
+from calculator.utils.blackbox import BlackBoxUtil
+from calculator.utils.lottery import LotteryUtil
+
+
+class CalculationCacheTest(APITestCase):
+    def setUp(self):
+        self.data = {
+            'lot_cost': {'costly': 1000, 'middle': 300, 'cheap': 100},
+            'costly_amount': 100,
+            'rentability': 0.2,
+            'loyalty': 0.6,
+            'black_box_cost': 0
+        }
+        get_calculation_cache().clear()
+
+    def test_lru_eviction(self):
+        cache = CalculationCache(max_size=2, ttl=60, alias=None)
+        for i in range(3):
+            cache.get_or_compute(BlackBoxUtil, {'i': i}, lambda: {'i': i})
+        self.assertEqual(cache.stats()['size'], 2)
+        cache.get_or_compute(BlackBoxUtil, {'i': 2}, lambda: None)
+        cache.get_or_compute(BlackBoxUtil, {'i': 0}, lambda: {'i': 0})
+        self.assertEqual(cache.stats()['local_hits'], 1)
+        self.assertEqual(cache.stats()['misses'], 4)
+
+    def test_key_depends_on_util_class_and_canonical_data(self):
+        cache = CalculationCache(max_size=2, ttl=60, alias=None)
+        self.assertEqual(cache.key(BlackBoxUtil, {'a': 1, 'b': 2}),
+                         cache.key(BlackBoxUtil, {'b': 2, 'a': 1}))
+        self.assertNotEqual(cache.key(BlackBoxUtil, {'a': 1}),
+                            cache.key(LotteryUtil, {'a': 1}))
+
+    def test_ttl(self):
+        cache = CalculationCache(max_size=2, ttl=60, alias=None)
+        with mock.patch('calculator.cache.monotonic', return_value=0):
+            cache.get_or_compute(BlackBoxUtil, {}, lambda: {'value': 1})
+        with mock.patch('calculator.cache.monotonic', return_value=61):
+            value = cache.get_or_compute(BlackBoxUtil, {}, lambda: {'value': 2})
+        self.assertEqual(value, {'value': 2})
+        self.assertEqual(cache.stats()['misses'], 2)
+
+    def test_calculate_hits_cache(self):
+        url = reverse('blackbox-list') + 'calculate/'
+        first = self.client.post(url, data=self.data, format='json')
+        with mock.patch.object(BlackBoxUtil, 'to_json') as to_json:
+            second = self.client.post(url, data=self.data, format='json')
+            to_json.assert_not_called()
+        self.assertEqual(first.json(), second.json())
+        stats = get_calculation_cache().stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+
+    def test_file_based_backend(self):
+        with tempfile.TemporaryDirectory() as location:
+            caches = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'calculate': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': location},
+            }
+            with override_settings(CACHES=caches,
+                                   CALCULATE_CACHE={'ALIAS': 'calculate', 'MAX_SIZE': 0}):
+                url = reverse('blackbox-list') + 'calculate/'
+                first = self.client.post(url, data=self.data, format='json')
+                second = self.client.post(url, data=self.data, format='json')
+                self.assertEqual(first.json(), second.json())
+                stats = get_calculation_cache().stats()
+                self.assertEqual(stats['backend_hits'], 1)
+                self.assertEqual(stats['misses'], 1)
+
+    def test_backend_is_shared_by_workers(self):
+        self.assertIsNone(get_calculation_cache().alias)
+        with tempfile.TemporaryDirectory() as location:
+            caches = {
+                'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+                'calculate': {'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                              'LOCATION': location},
+            }
+            with override_settings(CACHES=caches):
+                first, second = (CalculationCache(max_size=2, ttl=60, alias='calculate')
+                                 for _ in range(2))
+                first.get_or_compute(BlackBoxUtil, self.data, lambda: {'value': 1})
+                value = second.get_or_compute(BlackBoxUtil, self.data, lambda: None)
+                self.assertEqual(value, {'value': 1})
+                self.assertEqual(second.stats()['backend_hits'], 1)
+                self.assertEqual(second.stats()['misses'], 0)
+
+    def test_stats_endpoint_is_admin_only(self):
+        response = self.client.get(reverse('calculate-cache'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_authenticate(admin)
+        response = self.client.get(reverse('calculate-cache'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('hits', response.json())
@@ -1,9 +1,12 @@
 from copy import deepcopy
 
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from calculator.utils.pool import process_pool
+
 
 class CalculateTestBlackBox(APITestCase):
     @classmethod
@@ -70,6 +73,44 @@ class CalculateTestBlackBox(APITestCase):
         self.assertEqual(response.data['black_box_cost']['min'], exp_min)
 
 
+class CalculateGridTestBlackBox(APITestCase):
+    def test_calculate_grid(self):
+        data = {
+            'lot_cost': {'costly': 1000, 'middle': 300, 'cheap': 100},
+            'costly_amount': 100,
+            'black_box_cost': {'start': 0, 'stop': 400, 'step': 100},
+            'rentability': [0.2, 0.3],
+            'loyalty': {'start': 0.5, 'stop': 0.6, 'step': 0.05},
+        }
+        response = self.client.post(reverse('blackbox-list') + 'calculate_grid/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        res = response.json()
+        self.assertEqual(len(res['message']), 5 * 2 * 3)
+        self.assertEqual(res['black_box_cost']['input'][:6], [0] * 6)
+        self.assertEqual(res['rentability_input'][:6], [0.2] * 3 + [0.3] * 3)
+        self.assertEqual(res['loyalty_input'][:3], [0.5, 0.55, 0.6])
+        # same point as CalculateTestBlackBox.test_calculate
+        self.assertEqual(res['black_box_cost']['cur'][2], 460)
+        self.assertEqual({key: value[2] for key, value in res['amounts'].items()},
+                         {'cheap': 172, 'costly': 100, 'middle': 158})
+
+    def test_calculate_grid_validation(self):
+        data = {
+            'lot_cost': {'costly': 1000, 'middle': 300, 'cheap': 100},
+            'costly_amount': 100,
+            'black_box_cost': {'start': 0, 'stop': 1000000, 'step': 0.01},
+        }
+        response = self.client.post(reverse('blackbox-list') + 'calculate_grid/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data['black_box_cost'] = []
+        response = self.client.post(reverse('blackbox-list') + 'calculate_grid/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        data['black_box_cost'] = [100]
+        data['loyalty'] = [1.5]
+        response = self.client.post(reverse('blackbox-list') + 'calculate_grid/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
 class CalculateTestLottery(APITestCase):
     @classmethod
     def setUpClass(cls):
@@ -101,3 +142,87 @@ class CalculateTestLottery(APITestCase):
         self.assertIn('min_profit', data)
         self.assertIn('min_rentability', data)
         self.assertIn('max_rentability', data)
+
+
+class CalculateBatchTest(APITestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.black_box_data = [{
+            'lot_cost': {'costly': 1000, 'middle': 300, 'cheap': 100},
+            'costly_amount': 100,
+            'rentability': 0.2,
+            'loyalty': 0.6,
+            'black_box_cost': black_box_cost
+        } for black_box_cost in (0, 400, 100)]
+        cls.lottery_data = {
+            "lots": [
+                {"amount": 1, "price": 1000},
+                {"amount": 2, "price": 500},
+                {"amount": 3, "price": 200}
+            ],
+            "write_off": 1000,
+            "referral_coeff": 4,
+            "ticket_amount": 0,
+            "ticket_price": 0,
+            "discount": 0.05,
+        }
+        cls.bingo_data = {
+            'prices': [570, 1218, 1721],
+            'discounts': [0.1, 0.17, 0.71, 0.51, 0.58, 0.28, 0.77, 0.91, 0.02, 0.48],
+            'budget': 46536, 'lucky_participants': 87, 'usage_probability': 1,
+            'unlucky_participants': None, 'budget_distribution': None
+        }
+        cls.booster_data = {
+            'prices': [100, 200], 'booster_amount': 3, 'fix_amount': 3,
+            'budget': 1500, 'participants': 10, 'abs_budget_distribution': None,
+        }
+
+    def assert_batch_matches_calculate(self, url, items):
+        response = self.client.post(url + 'calculate_batch/', data=items, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()
+        self.assertEqual(len(results), len(items))
+        for item, result in zip(items, results):
+            single = self.client.post(url + 'calculate/', data=item, format='json')
+            self.assertEqual(result, single.json())
+        return results
+
+    def test_black_box_batch(self):
+        results = self.assert_batch_matches_calculate(reverse('blackbox-list'), self.black_box_data)
+        self.assertEqual([result['black_box_cost']['cur'] for result in results], [460, 400, 460])
+
+    def test_lottery_batch(self):
+        other = deepcopy(self.lottery_data)
+        other['ticket_amount'] = 30
+        other['ticket_price'] = 130
+        self.assert_batch_matches_calculate(reverse('lottery-list'), [self.lottery_data, other])
+
+    def test_bingo_batch(self):
+        self.assert_batch_matches_calculate(reverse('bingodiscount-list'), [self.bingo_data])
+        self.assert_batch_matches_calculate(reverse('bingobooster-list'), [self.booster_data])
+
+    def test_failing_item(self):
+        data = deepcopy(self.lottery_data)
+        data['lots'] = []
+        response = self.client.post(reverse('lottery-list') + 'calculate_batch/',
+                                    data=[self.lottery_data, data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()
+        self.assertTrue(results[0]['success'])
+        self.assertFalse(results[1]['success'])
+
+    def test_validation(self):
+        data = deepcopy(self.lottery_data)
+        data['write_off'] = -1
+        response = self.client.post(reverse('lottery-list') + 'calculate_batch/',
+                                    data=[self.lottery_data, data], format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        errors = response.json()
+        self.assertEqual(errors[0], {})
+        self.assertIn('write_off', errors[1])
+
+    @override_settings(CALCULATE_BATCH_POOL_THRESHOLD=1, PROCESS_POOL_WORKERS=2)
+    def test_pool(self):
+        self.assert_batch_matches_calculate(reverse('blackbox-list'), self.black_box_data)
+        self.assertIs(process_pool(), process_pool(8))
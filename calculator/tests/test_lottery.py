@@ -1,10 +1,16 @@
 from copy import deepcopy
+import os
 from decimal import Decimal
+from unittest import mock
 
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
 
+from calculator.cache import load_lottery_session
 from calculator.models.product import Product
 from calculator.models.lottery import Lottery, Ticket
 
@@ -145,3 +151,191 @@ class LotteryTest(APITestCase):
         lottery = Lottery.from_json(data1)
         lottery.save()
         self.assertEqual(lottery.truncated_name(), '123456789012...')
+
+    def test_large_lottery_query_count(self):
+        data = deepcopy(self.data)
+        data['ticket_amount'] = 20000
+        with CaptureQueriesContext(connection) as queries:
+            lottery = Lottery.from_json(data)
+        batch_size = connection.ops.bulk_batch_size(['product', 'lottery', 'number'],
+                                                    [Ticket()])
+        self.assertLessEqual(len(queries), 20000 // batch_size + 20)
+        self.assertEqual(lottery.ticket_amount(), 20000)
+        self.assertEqual(Ticket.objects.filter(product__isnull=False).count(), 6)
+
+    def test_post_sparse(self):
+        data = deepcopy(self.data)
+        data['storage'] = 'sparse'
+        response = self.client.post(reverse('lottery-list'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        lottery = Lottery.objects.get()
+        self.assertEqual(lottery.storage, Lottery.SPARSE)
+        self.assertEqual(Ticket.objects.all().count(), 6)
+        self.assertEqual(lottery.ticket_amount(), 24)
+        self.assertEqual(lottery.lots(), [
+            {"amount": 1, "price": 1000.0},
+            {"amount": 2, "price": 500.0},
+            {"amount": 3, "price": 200.0}
+        ])
+
+    def test_huge_sparse_lottery(self):
+        data = deepcopy(self.data)
+        data['storage'] = 'sparse'
+        data['ticket_amount'] = 10 ** 12
+        lottery = Lottery.from_json(data)
+        self.assertEqual(Lottery.objects.get(pk=lottery.pk).ticket_amount(), 10 ** 12)
+        tickets = list(lottery.lottery_items.order_by('number'))
+        self.assertEqual(len(tickets), 6)
+        self.assertEqual(sorted(ticket.product.price for ticket in tickets),
+                         [200, 200, 200, 500, 500, 1000])
+        self.assertEqual(lottery.get_ticket(tickets[0].number), tickets[0].product)
+
+        data['ticket_amount'] = 2 ** 63
+        response = self.client.post(reverse('lottery-list'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('ticket_amount', response.json())
+
+    def test_get_ticket(self):
+        for storage in (Lottery.DENSE, Lottery.SPARSE):
+            data = deepcopy(self.data)
+            data['storage'] = storage
+            lottery = Lottery.from_json(data)
+            prices = []
+            for number in range(24):
+                response = self.client.get(
+                    reverse('lottery-detail', args=[lottery.pk]) + f'ticket/{number}/'
+                )
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                ticket = response.json()
+                self.assertEqual(ticket['lucky'], ticket['price'] is not None)
+                if ticket['lucky']:
+                    prices.append(ticket['price'])
+            self.assertEqual(sorted(prices), [200, 200, 200, 500, 500, 1000])
+            response = self.client.get(
+                reverse('lottery-detail', args=[lottery.pk]) + 'ticket/24/'
+            )
+            self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_convert_to_sparse(self):
+        lottery = Lottery.from_json(deepcopy(self.data))
+        lots = lottery.lots()
+        winners = {number: lottery.get_ticket(number) for number in range(24)}
+        call_command('convert_lotteries_to_sparse', stdout=open(os.devnull, 'w'))
+        lottery.refresh_from_db()
+        self.assertEqual(lottery.storage, Lottery.SPARSE)
+        self.assertEqual(Ticket.objects.all().count(), 6)
+        self.assertEqual(lottery.ticket_amount(), 24)
+        self.assertEqual(lottery.lots(), lots)
+        self.assertEqual({number: lottery.get_ticket(number) for number in range(24)},
+                         winners)
+
+    def test_list_query_count(self):
+        Lottery.from_json(deepcopy(self.data))
+        with CaptureQueriesContext(connection) as small:
+            response = self.client.get(reverse('lottery-list'))
+        self.assertEqual(len(response.json()), 1)
+        for _ in range(5):
+            data = deepcopy(self.data)
+            data['ticket_amount'] = 1000
+            Lottery.from_json(data)
+        with CaptureQueriesContext(connection) as large:
+            response = self.client.get(reverse('lottery-list'))
+        data = response.json()
+        self.assertEqual(len(data), 6)
+        self.assertEqual(len(small), len(large))
+        self.assertEqual(len(large), 2)
+        self.assertEqual(sorted(lottery['ticket_amount'] for lottery in data),
+                         [24] + [1000] * 5)
+        for lottery in data:
+            self.assertEqual(lottery['lots'], [
+                {"amount": 1, "price": 1000.0},
+                {"amount": 2, "price": 500.0},
+                {"amount": 3, "price": 200.0}
+            ])
+
+    def test_session(self):
+        data = {key: self.data[key] for key in
+                ('lots', 'write_off', 'referral_coeff', 'discount')}
+        data.update(ticket_amount=0, ticket_price=0)
+        response = self.client.post(reverse('lottery-list') + 'session/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['ticket_price']['cur'], 150)
+        url = reverse('lottery-list') + f'session/{response.data["token"]}/'
+
+        changes = {'changes': [{'field': 'amount', 'lot': 1, 'op': 'add', 'value': 2},
+                               {'field': 'ticket_amount', 'value': 30},
+                               {'field': 'ticket_price', 'value': 130}]}
+        response = self.client.patch(url, data=changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data['lots'][1]['amount'] = 4
+        data.update(ticket_amount=30, ticket_price=130)
+        expected = self.client.post(reverse('lottery-list') + 'calculate/', data=data, format='json')
+        self.assertEqual(response.data['total_cost'], 3600)
+        for key in ('ticket_amount', 'ticket_price', 'write_off', 'min_profit'):
+            self.assertEqual(response.data[key], expected.data[key])
+
+        changes = {'changes': [{'field': 'amount', 'lot': 1, 'value': 1.5}]}
+        response = self.client.patch(url, data=changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        changes = {'changes': [{'field': 'write_off', 'value': -1}]}
+        response = self.client.patch(url, data=changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(response.data['message'], 'Error: write_off < 0')
+
+        self.assertEqual(self.client.delete(url).status_code, status.HTTP_204_NO_CONTENT)
+        response = self.client.patch(url, data={'changes': []}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+    def test_concurrent_session_changes(self):
+        data = {key: self.data[key] for key in
+                ('lots', 'write_off', 'referral_coeff', 'discount')}
+        data.update(ticket_amount=30, ticket_price=150)
+        token = self.client.post(reverse('lottery-list') + 'session/',
+                                 data=data, format='json').data['token']
+        url = reverse('lottery-list') + f'session/{token}/'
+        stale = load_lottery_session(token)
+        changes = {'changes': [{'field': 'ticket_price', 'value': 130}]}
+        response = self.client.patch(url, data=changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # a request that loaded the session before the change above
+        with mock.patch('calculator.views.lottery.load_lottery_session', return_value=stale):
+            response = self.client.patch(url, data=changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_409_CONFLICT)
+        version, session = load_lottery_session(token)
+        self.assertEqual((version, session.params['ticket_price']), (1, 130))
+        response = self.client.patch(url, data=changes, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_optimize(self):
+        data = {key: self.data[key] for key in
+                ('lots', 'write_off', 'referral_coeff', 'discount')}
+        data['min_rentability'] = 0.1
+        response = self.client.post(reverse('lottery-list') + 'optimize/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['objective'], 'min_profit')
+        prices = [point['ticket_price'] for point in response.data['front']]
+        amounts = [point['ticket_amount'] for point in response.data['front']]
+        self.assertEqual(prices, sorted(prices))
+        self.assertEqual(amounts, sorted(amounts, reverse=True))
+        self.assertIn(response.data['best'], response.data['front'])
+        data['objective'] = 'profit'
+        response = self.client.post(reverse('lottery-list') + 'optimize/', data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_seed(self):
+        data = deepcopy(self.data)
+        data['seed'] = '12345678901234567890123456789'
+        response = self.client.post(reverse('lottery-list'), data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        lottery = Lottery.objects.get()
+        self.assertEqual(lottery.seed, data['seed'])
+        winners = list(lottery.lottery_items.filter(product__isnull=False)
+                       .values_list('number', 'product__price'))
+        other = Lottery.from_json(deepcopy(data))
+        self.assertEqual(list(other.lottery_items.filter(product__isnull=False)
+                              .values_list('number', 'product__price')), winners)
+
+        response = self.client.get(reverse('lottery-detail', args=[lottery.pk]))
+        self.assertEqual(response.json()['seed'], data['seed'])
+        unseeded = Lottery.from_json(deepcopy(self.data))
+        self.assertTrue(unseeded.seed.isdigit())
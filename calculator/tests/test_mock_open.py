@@ -1,7 +1,9 @@
+import json
 from collections import Counter
 from decimal import Decimal
 from random import seed
 
+from django.test import override_settings
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
@@ -89,3 +91,124 @@ class MockOpenTest(APITestCase):
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         res = response.json()['product_categories']
         self.assertEqual(Counter(res), Counter(data['lot_amount']))
+
+    def test_api_aggregate(self):
+        pk = self.bb_2.pk
+        response = self.client.post(reverse('blackbox-detail', args=[pk]) + 'mock_open/',
+                                    data={'n': 100, 'output': 'aggregate'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['counts'], {'costly': 10, 'middle': 20, 'cheap': 30})
+        self.assertEqual(data['opened'], 60)
+        self.assertEqual(data['total_giveaway'], 60000)
+        self.assertEqual(data['ran_out_at'], 60)
+
+    def test_api_streaming(self):
+        pk = self.bb_2.pk
+        url = reverse('blackbox-detail', args=[pk]) + 'mock_open/'
+        decoded = {}
+        for output in ('ndjson', 'index', 'rle'):
+            response = self.client.post(url, data={'n': 100, 'output': output})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertTrue(response.streaming)
+            lines = [json.loads(line) for line
+                     in b''.join(response.streaming_content).splitlines()]
+            self.assertEqual(lines[-1]['opened'], 60)
+            if output == 'ndjson':
+                decoded[output] = [c for line in lines[:-1] for c in line['product_categories']]
+            elif output == 'index':
+                decoded[output] = [LOT_CATEGORIES[int(i)] for line in lines[1:-1]
+                                   for i in line['indices']]
+            else:
+                decoded[output] = [LOT_CATEGORIES[i] for line in lines[1:-1]
+                                   for i, length in line['runs'] for _ in range(length)]
+        for res in decoded.values():
+            self.assertEqual(Counter(res), Counter(
+                {'costly': 10, 'middle': 20, 'cheap': 30}
+            ))
+
+    def test_mock_open_unsaved_api_does_not_query_db(self):
+        data = {
+            'name': 'Box 3',
+            'price': 170,
+            'lot_cost': {'costly': 300, 'middle': 200, 'cheap': 100},
+            'lot_amount': {'costly': 1, 'middle': 2, 'cheap': 3},
+            'n': 6
+        }
+        products_count = Product.objects.count()
+        with self.assertNumQueries(0):
+            response = self.client.post(reverse('blackbox-list') + 'mock_open_unsaved/',
+                                        data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(Product.objects.count(), products_count)
+
+    def test_mock_open_unsaved_api_validation(self):
+        data = {
+            'name': 'Box 3',
+            'price': 170,
+            'lot_cost': {'costly': 100, 'middle': 200, 'cheap': 300},
+            'lot_amount': {'costly': 1, 'middle': 2, 'cheap': 3},
+            'n': 6
+        }
+        response = self.client.post(reverse('blackbox-list') + 'mock_open_unsaved/',
+                                    data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_mock_open_unsaved_api_aggregate(self):
+        data = {
+            'name': 'Box 3',
+            'price': 170,
+            'lot_cost': {'costly': 300, 'middle': 200, 'cheap': 100},
+            'lot_amount': {'costly': 1, 'middle': 2, 'cheap': 3},
+            'n': 6,
+            'output': 'aggregate',
+        }
+        response = self.client.post(reverse('blackbox-list') + 'mock_open_unsaved/',
+                                    data=data, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['counts'], data['lot_amount'])
+
+    def test_distribution(self):
+        url = reverse('blackbox-detail', args=[self.bb_2.pk]) + 'distribution/'
+        response = self.client.post(url, data={}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertAlmostEqual(data['expected_openings'], 60)
+        self.assertAlmostEqual(data['expected_giveaway'], 60000)
+        for category, amount in zip(LOT_CATEGORIES, [10, 20, 30]):
+            self.assertAlmostEqual(data['expected_counts'][category], amount)
+            self.assertAlmostEqual(data['probabilities'][category][0], amount / 60)
+        response = self.client.post(url, data={'n': 5}, format='json')
+        self.assertEqual(len(response.json()['probabilities']['cheap']), 5)
+
+    @override_settings(DISTRIBUTION_MAX_SIZE=10 ** 4)
+    def test_distribution_size(self):
+        url = reverse('blackbox-detail', args=[self.bb_2.pk]) + 'distribution/'
+        response = self.client.post(url, data={}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, data={'n': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+    def test_mock_open_seed(self):
+        url = reverse('blackbox-detail', args=[self.bb_2.pk]) + 'mock_open/'
+        first = self.client.post(url, data={'n': 40}, format='json').json()
+        second = self.client.post(url, data={'n': 40, 'seed': first['seed']}, format='json').json()
+        self.assertEqual(first, second)
+        response = self.client.post(url, data={'n': 40, 'seed': -1}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(url, data={'n': 40, 'seed': 7, 'output': 'aggregate'},
+                                    format='json')
+        self.assertEqual(response.json()['seed'], '7')
+
+    def test_simulate(self):
+        url = reverse('blackbox-detail', args=[self.bb_2.pk]) + 'simulate/'
+        response = self.client.post(url, data={'runs': 20, 'seed': 5}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(data['runs'], 20)
+        self.assertEqual(data['seed'], '5')
+        self.assertEqual(data['openings']['mean'], 60)
+        self.assertAlmostEqual(data['payout']['mean'][-1], 60000)
+        self.assertAlmostEqual(sum(data['probabilities']['costly']), 10)
+        response = self.client.post(url, data={'runs': 0}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
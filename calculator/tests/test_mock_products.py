@@ -0,0 +1,93 @@
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.management import call_command
+from django.db import OperationalError
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from calculator.housekeeping import reset_sweep_deadline, sweep_mock_products
+from calculator.models.blackbox import BlackBox
+from calculator.models.lottery import Lottery
+from calculator.models.product import Product, MOCK_NAME
+
+
+def box_data(costly=1000, middle=100, cheap=10):
+    return {
+        'name': 'Box', 'price': 200,
+        'lot_cost': {'costly': costly, 'middle': middle, 'cheap': cheap},
+        'lot_amount': {'costly': 1, 'middle': 3, 'cheap': 6},
+    }
+
+
+class MockProductsTest(TestCase):
+    def setUp(self):
+        cache.clear()
+
+    def mocks(self):
+        return Product.objects.filter(name=MOCK_NAME)
+
+    def test_pool_is_reused(self):
+        first = BlackBox.from_json(box_data())
+        second = BlackBox.from_json(box_data(middle=100.0))
+        self.assertEqual(self.mocks().count(), 3)
+        self.assertEqual(first.products(), second.products())
+
+    def test_repeated_price_gets_distinct_products(self):
+        products = Product.get_mock_products([500, 500, 200])
+        self.assertEqual(len({product.pk for product in products}), 3)
+        self.assertEqual(Product.get_mock_products([500, 200, 500]),
+                         [products[0], products[2], products[1]])
+        lottery = Lottery.from_json({
+            'name': 'Lottery', 'lots': [{'amount': 1, 'price': 500}, {'amount': 2, 'price': 500}],
+            'write_off': 1000, 'referral_coeff': 4, 'ticket_amount': 10, 'total_cost': 1500,
+            'ticket_price': 150, 'min_profit': 250, 'min_rentability': 0.1,
+            'max_rentability': 0.38, 'discount': 0.05,
+        })
+        self.assertEqual(sorted(lot['amount'] for lot in lottery.lots()), [1, 2])
+
+    def test_delete_unreferenced(self):
+        box = BlackBox.from_json(box_data())
+        BlackBox.from_json(box_data(3000, 300, 30), instance=box)
+        Product.objects.create(name='product', price=10)
+        self.assertEqual(Product.unreferenced_mocks().count(), 3)
+        self.assertEqual(Product.delete_unreferenced_mocks(batch_size=1, max_batches=2), 2)
+        self.assertEqual(Product.delete_unreferenced_mocks(), 1)
+        self.assertEqual(self.mocks().count(), 3)
+        self.assertEqual(Product.objects.filter(name='product').count(), 1)
+        self.assertEqual(len(BlackBox.objects.get().products()), 3)
+
+    def test_command(self):
+        box = BlackBox.from_json(box_data())
+        box.delete()
+        out = StringIO()
+        call_command('collect_mock_products', dry_run=True, stdout=out)
+        self.assertIn('3 unreferenced', out.getvalue())
+        self.assertEqual(self.mocks().count(), 3)
+        call_command('collect_mock_products', batch_size=2, stdout=out)
+        self.assertEqual(self.mocks().count(), 0)
+
+    @override_settings(MOCK_PRODUCTS_GC={'INTERVAL': 60, 'BATCH_SIZE': 2, 'MAX_BATCHES': 1,
+                                         'CACHE': 'shared'})
+    def test_sweep_is_throttled(self):
+        BlackBox.from_json(box_data()).delete()
+        self.assertEqual(sweep_mock_products(), 2)
+        self.assertIsNone(sweep_mock_products())
+        # a worker that has not swept yet still finds the interval taken
+        reset_sweep_deadline('MOCK_PRODUCTS_GC')
+        self.assertIsNone(sweep_mock_products())
+        self.assertEqual(self.mocks().count(), 1)
+        caches['shared'].clear()
+        reset_sweep_deadline('MOCK_PRODUCTS_GC')
+        self.assertEqual(sweep_mock_products(), 1)
+
+    @override_settings(MOCK_PRODUCTS_GC={'INTERVAL': 60, 'CACHE': 'default'})
+    def test_failed_sweep_keeps_the_response(self):
+        box = BlackBox.from_json(box_data())
+        error = OperationalError('database is locked')
+        with mock.patch.object(Product, 'delete_unreferenced_mocks', side_effect=error), \
+                self.assertLogs('calculator.housekeeping', 'ERROR'):
+            response = self.client.delete(reverse('blackbox-detail', args=[box.pk]))
+        self.assertEqual(response.status_code, 204)
+        self.assertFalse(BlackBox.objects.exists())
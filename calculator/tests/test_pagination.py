@@ -0,0 +1,80 @@
+from copy import deepcopy
+
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from calculator.models.bingodiscount import BingoDiscount
+from calculator.models.lottery import Lottery
+from calculator.tests.test_bingo import bingo_data
+
+
+LOTTERY_DATA = {
+    'name': 'Lottery',
+    'lots': [{'amount': 1, 'price': 1000.0}, {'amount': 2, 'price': 500.0}],
+    'write_off': 1000.0, 'referral_coeff': 4, 'ticket_amount': 100,
+    'total_cost': 2000.0, 'ticket_price': 150.0, 'min_profit': 250.0,
+    'min_rentability': 0.1, 'max_rentability': 0.38, 'discount': 0.05,
+    'storage': 'sparse',
+}
+
+
+class PaginationTest(APITestCase):
+    def create_lotteries(self, n):
+        for i in range(n):
+            data = deepcopy(LOTTERY_DATA)
+            data['name'] = f'Lottery {i}'
+            Lottery.from_json(data)
+
+    def test_list_is_whole_without_params(self):
+        self.create_lotteries(3)
+        response = self.client.get(reverse('lottery-list'))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()), 3)
+
+    def test_cursor(self):
+        self.create_lotteries(5)
+        url = reverse('lottery-list') + '?page_size=2'
+        ids = []
+        while url is not None:
+            page = self.client.get(url).json()
+            self.assertLessEqual(len(page['results']), 2)
+            ids.extend(lottery['id'] for lottery in page['results'])
+            url = page['next']
+        self.assertEqual(ids, sorted(Lottery.objects.values_list('id', flat=True), reverse=True))
+        self.assertEqual(page['results'][0]['lots'], [{'amount': 1, 'price': 1000.0},
+                                                      {'amount': 2, 'price': 500.0}])
+
+    def test_page_query_count_is_constant(self):
+        self.create_lotteries(2)
+        url = reverse('lottery-list') + '?page_size=2'
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(url)
+        self.create_lotteries(10)
+        with CaptureQueriesContext(connection) as large:
+            page = self.client.get(url).json()
+        self.assertEqual(len(page['results']), 2)
+        self.assertEqual(len(small), len(large))
+
+    def test_fields(self):
+        self.create_lotteries(3)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('lottery-list') + '?fields=id,name,unknown')
+        self.assertEqual([set(lottery) for lottery in response.json()], [{'id', 'name'}] * 3)
+        self.assertEqual(len(queries), 1)
+
+        pk = Lottery.objects.first().pk
+        response = self.client.get(reverse('lottery-detail', args=[pk]) + '?fields=lots')
+        self.assertEqual(list(response.json()), ['lots'])
+
+    def test_bingo_fields_skip_the_matrix(self):
+        for i in range(3):
+            BingoDiscount.from_json(bingo_data(4, 3, name=f'Bingo {i}'))
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('bingodiscount-list') + '?fields=id,name&page_size=2')
+        self.assertEqual([set(bingo) for bingo in response.json()['results']], [{'id', 'name'}] * 2)
+        self.assertEqual(len(queries), 1)
+        response = self.client.get(reverse('bingodiscount-list') + '?fields=name,amounts')
+        self.assertEqual(response.json()[0]['amounts'], bingo_data(4, 3)['amounts'])
@@ -0,0 +1,105 @@
+import tracemalloc
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.test import override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from calculator.cache import get_calculation_cache
+from calculator.profiling import get_request_histogram
+from calculator.utils.timing import Profile, activate, deactivate, span, timed
+
+
+@override_settings(PROFILING={'ENABLED': True})
+class ProfilingTest(APITestCase):
+    def setUp(self):
+        self.data = {
+            'lot_cost': {'costly': 1000, 'middle': 300, 'cheap': 100},
+            'costly_amount': 100,
+            'rentability': 0.2,
+            'loyalty': 0.6,
+            'black_box_cost': 0
+        }
+        cache.clear()
+        get_calculation_cache().clear()
+        get_request_histogram().clear()
+        self.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+
+    def metrics(self, response):
+        return {metric.split(';')[0] for metric in response['Server-Timing'].split(', ')}
+
+    def test_server_timing(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('blackbox-list') + 'calculate/',
+                                    data=self.data, format='json')
+        self.assertTrue({'total', 'db', 'validate', 'calculate', 'BlackBoxUtil.__init__'}
+                        <= self.metrics(response))
+        self.assertIn('desc="0 queries"', response['Server-Timing'])
+
+        response = self.client.post(reverse('product-list'),
+                                    data={'name': 'Product', 'price': 100}, format='json')
+        self.assertIn('desc="1 queries"', response['Server-Timing'])
+
+    def test_server_timing_is_for_staff(self):
+        with self.settings(DEBUG=False):
+            response = self.client.post(reverse('blackbox-list') + 'calculate/',
+                                        data=self.data, format='json')
+        self.assertNotIn('Server-Timing', response)
+        with self.settings(DEBUG=True):
+            response = self.client.post(reverse('blackbox-list') + 'calculate/',
+                                        data=self.data, format='json')
+        self.assertIn('Server-Timing', response)
+
+    def test_histogram_endpoint(self):
+        for _ in range(3):
+            self.client.post(reverse('blackbox-list') + 'calculate/', data=self.data, format='json')
+        response = self.client.get(reverse('profiling'))
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+        self.client.force_authenticate(self.admin)
+        stats = self.client.get(reverse('profiling')).json()['POST blackbox-calculate']
+        self.assertEqual(stats['count'], 3)
+        self.assertEqual(sum(stats['total_ms']['histogram'].values()), 3)
+        self.assertIn('calculate', stats['spans_ms'])
+        self.assertEqual(self.client.delete(reverse('profiling')).status_code,
+                         status.HTTP_204_NO_CONTENT)
+        self.assertNotIn('POST blackbox-calculate', self.client.get(reverse('profiling')).json())
+
+    def test_unmatched_paths_share_a_name(self):
+        for path in ('/missing/', '/missing/too/'):
+            self.client.get(path)
+        self.assertEqual(get_request_histogram().stats()['GET <unmatched>']['count'], 2)
+
+    @override_settings(PROFILING={'ENABLED': True, 'TRACEMALLOC': True, 'WINDOW': 2})
+    def test_allocation_peak_and_window(self):
+        self.addCleanup(tracemalloc.stop)
+        for _ in range(3):
+            self.client.post(reverse('blackbox-list') + 'calculate/', data=self.data, format='json')
+        stats = get_request_histogram().stats()['POST blackbox-calculate']
+        self.assertEqual(stats['count'], 2)
+        self.assertGreater(stats['alloc_peak_bytes']['max'], 0)
+
+    @override_settings(PROFILING={})
+    def test_disabled_by_default(self):
+        self.client.force_authenticate(self.admin)
+        response = self.client.post(reverse('blackbox-list') + 'calculate/',
+                                    data=self.data, format='json')
+        self.assertNotIn('Server-Timing', response)
+        self.assertEqual(get_request_histogram().stats(), {})
+
+    def test_spans(self):
+        @timed()
+        def work():
+            with span('inner'):
+                pass
+
+        work()
+        profile = Profile()
+        token = activate(profile)
+        work()
+        work()
+        deactivate(token)
+        self.assertEqual(set(profile.spans), {'inner', 'ProfilingTest.test_spans.<locals>.work'})
+        self.assertEqual(profile.counts['inner'], 2)
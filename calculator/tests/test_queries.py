@@ -0,0 +1,143 @@
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from rest_framework.test import APITestCase
+from rest_framework import status
+
+from calculator.models.product import Product
+from calculator.queries import QueryBudgetExceeded, budgeted, query_budget
+from calculator.tests.test_bingo import bingo_data
+from calculator.urls import router
+from calculator.utils.blackbox import LOT_CATEGORIES
+
+
+ACTIONS = ('list', 'retrieve', 'create', 'update', 'destroy', 'calculate', 'mock_open')
+
+
+def black_box(size):
+    return {
+        'name': 'Box', 'price': 200,
+        'lot_cost': {'costly': 1000, 'middle': 100, 'cheap': 10},
+        'lot_amount': {'costly': size, 'middle': 3 * size, 'cheap': 6 * size},
+    }
+
+
+def black_box_products(size):
+    products = [Product.objects.get_or_create(name=category, price=price)[0]
+                for category, price in zip(LOT_CATEGORIES, (1000, 100, 10))]
+    data = black_box(size)
+    del data['lot_cost']
+    return {**data, 'product_ids': {category: product.pk
+                                    for category, product in zip(LOT_CATEGORIES, products)}}
+
+
+def black_box_calculate(size):
+    return {'lot_cost': {'costly': 1000, 'middle': 300, 'cheap': 100},
+            'costly_amount': 10 * size, 'black_box_cost': 0}
+
+
+def lottery_calculate(size):
+    return {
+        'lots': [{'amount': i + 1, 'price': 1000 - 10 * i} for i in range(3 * size)],
+        'write_off': 1000, 'referral_coeff': 4, 'ticket_amount': 0,
+        'ticket_price': 0, 'discount': 0.05,
+    }
+
+
+def lottery(size):
+    return {**lottery_calculate(size), 'name': 'Lottery', 'ticket_amount': 1000 * size,
+            'total_cost': 2600, 'ticket_price': 150, 'min_profit': 250,
+            'min_rentability': 0.1, 'max_rentability': 0.38}
+
+
+def bingo_calculate(size):
+    data = bingo_data(3 * size, 2 * size)
+    return {key: data[key] for key in ('prices', 'discounts', 'budget', 'lucky_participants',
+                                       'usage_probability', 'unlucky_participants',
+                                       'budget_distribution')}
+
+
+def booster_calculate(size):
+    return {'prices': [100 * (i + 1) for i in range(size)], 'booster_amount': 3,
+            'fix_amount': 3, 'budget': 1500, 'participants': 10,
+            'abs_budget_distribution': None}
+
+
+CASES = (
+    ('product', lambda size: {'name': 'Product', 'price': 100}, None),
+    ('blackbox', black_box, black_box_calculate),
+    ('blackbox', black_box_products, None),
+    ('lottery', lottery, lottery_calculate),
+    ('bingodiscount', lambda size: bingo_data(3 * size, 2 * size), bingo_calculate),
+    ('bingobooster', lambda size: {'name': 'Booster'}, booster_calculate),
+)
+
+
+class QueryBudgetTest(TestCase):
+    @override_settings(QUERY_BUDGETS_ENFORCE=True)
+    def test_budget(self):
+        with query_budget(1) as counter:
+            Product.objects.count()
+        self.assertEqual(len(counter), 1)
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(1):
+                Product.objects.count()
+                Product.objects.count()
+
+    @override_settings(QUERY_BUDGETS_ENFORCE=True)
+    def test_nested_budgets(self):
+        count = budgeted(2)(Product.objects.count)
+        with query_budget(1) as outer:
+            count()
+            count()
+            Product.objects.count()
+        self.assertEqual(len(outer), 3)
+
+    @override_settings(QUERY_BUDGETS_ENFORCE=True)
+    def test_repeated_nested_budget(self):
+        count = budgeted(1, 'count')(Product.objects.count)
+        with self.assertRaises(QueryBudgetExceeded):
+            with query_budget(0):
+                count()
+                count()
+
+    @override_settings(QUERY_BUDGETS_ENFORCE=False)
+    def test_warning(self):
+        with self.assertLogs('calculator.queries', 'WARNING'):
+            with query_budget(0, 'count'):
+                Product.objects.count()
+
+
+@override_settings(QUERY_BUDGETS_ENFORCE=True)
+class ViewSetQueryBudgetTest(APITestCase):
+    """every action stays within its budget while the data grows"""
+    def test_budgets_are_declared(self):
+        for prefix, viewset, basename in router.registry:
+            actions = {action for action in ACTIONS if hasattr(viewset, action)}
+            self.assertLessEqual(actions, set(viewset.query_budgets), basename)
+
+    def test_actions(self):
+        for basename, payload, calculate in CASES:
+            for size in (1, 4):
+                with self.subTest(basename=basename, payload=payload.__name__, size=size):
+                    self.check_actions(basename, payload, calculate, size)
+
+    def check_actions(self, basename, payload, calculate, size):
+        url = reverse(f'{basename}-list')
+        for _ in range(size):
+            response = self.client.post(url, data=payload(size), format='json')
+            self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.client.get(url).status_code, status.HTTP_200_OK)
+
+        viewset = next(viewset for _, viewset, name in router.registry if name == basename)
+        pk = viewset.queryset.model.objects.latest('pk').pk
+        detail = reverse(f'{basename}-detail', args=[pk])
+        self.assertEqual(self.client.get(detail).status_code, status.HTTP_200_OK)
+        response = self.client.put(detail, data=payload(size), format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        if calculate is not None:
+            response = self.client.post(url + 'calculate/', data=calculate(size), format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        if basename == 'blackbox':
+            response = self.client.post(detail + 'mock_open/', data={'n': 10 * size})
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete(detail).status_code, status.HTTP_204_NO_CONTENT)
@@ -1,9 +1,11 @@
-from math import isclose
+from decimal import Decimal
+from math import floor, isclose
+import random
 
 import pytest
 
 from calculator.utils.bingo import BingoUtil, DiscountBingoUtil,\
-    BoosterBingoUtil, MiniBingoUtil, BOOSTER_VALUES
+    BoosterBingoUtil, MiniBingoUtil, MiniBingoArrayUtil, BOOSTER_VALUES
 from .data.util_lottery_data import RWEB_DATA, RPS_DATA, SFL_DATA,\
     INIT_DISCOUNT_DATA, DIC_DATA, INIT_BOOSTER_DATA, RECALC_DISCOUNT_DATA
 
@@ -26,6 +28,22 @@ class TestBingo:
         assert isclose(sum(amounts), sum(res))
         assert max(abs(a - r) for a, r in zip(amounts, res)) < 1
 
+    @pytest.mark.parametrize("amounts, exp", [
+        ([33.4, 33.3, 33.3], [34, 33, 33]),
+        ([Decimal(100) / 3] * 3, [33, 33, 34]),
+        ([0.5, 0.5], [0, 1]),
+        ([Decimal('0.5')] * 5, [0, 0, 1, 1, 1]),
+        ([1.25, 1.25], [1, 2]),
+        ([48.087, 22.504, 16.409], [48, 23, 16]),
+    ])
+    def test_round_preserving_sum_largest_remainder(self, amounts, exp):
+        assert BingoUtil.round_preserving_sum(amounts) == exp
+
+    @pytest.mark.parametrize("n", [63, 64, 205])
+    def test_round_preserving_sum_is_exact(self, n):
+        res = BingoUtil.round_preserving_sum([Decimal('0.1')] * n)
+        assert sum(res) == floor(Decimal('0.1') * n + Decimal('0.5'))
+
     @pytest.mark.parametrize("inp, exp", SFL_DATA)
     def test_solve_for_single_lot(self, inp, exp):
         bingo = MiniBingoUtil(*inp)
@@ -61,3 +79,16 @@ class TestBingo:
         assert all(all(a >= 0 for a in row['fix']) for row in res['values'])
         assert all(all(a >= 0 for a in row) for row in res['amounts'])
         assert sum(sum(row) for row in res['amounts']) <= input_data['participants']
+
+    @pytest.mark.parametrize("seed", range(5))
+    def test_array_util_matches_single_lots(self, seed):
+        rnd = random.Random(seed)
+        n, k = 2000, rnd.randint(1, 10)
+        discounts = [sorted(round(rnd.uniform(0.01, 0.95), 2) for _ in range(k))
+                     for _ in range(n)]
+        prices = [float(rnd.randint(50, 3000)) for _ in range(n)]
+        budgets = [rnd.randint(0, 20000) for _ in range(n)]
+        lucky_participants = [rnd.randint(0, 200) for _ in range(n)]
+        res = MiniBingoArrayUtil(prices, discounts, budgets, lucky_participants).amounts
+        assert res == [MiniBingoUtil(*lot).amounts for lot
+                       in zip(prices, discounts, budgets, lucky_participants)]
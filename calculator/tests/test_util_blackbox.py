@@ -1,7 +1,8 @@
 from copy import deepcopy
+from itertools import product
 import unittest
 
-from calculator.utils.blackbox import BlackBoxUtil
+from calculator.utils.blackbox import BlackBoxUtil, BlackBoxGridUtil, LOT_CATEGORIES
 
 
 class BlackBoxTest(unittest.TestCase):
@@ -55,3 +56,34 @@ class BlackBoxTest(unittest.TestCase):
         res2 = box.to_json()
         self.assertEqual(res1['probabilities'], res2['probabilities'])
         self.assertEqual(res1, res2)
+
+
+class BlackBoxGridTest(unittest.TestCase):
+    def assert_grid_matches_util(self, lot_cost, costly_amount, costs, rentabilities, loyalties):
+        grid = BlackBoxGridUtil(lot_cost, costly_amount, costs, rentabilities, loyalties).to_json()
+        points = product(costs, rentabilities, loyalties)
+        for i, (cost, rentability, loyalty) in enumerate(points):
+            try:
+                exp = BlackBoxUtil(lot_cost, costly_amount, cost, rentability, loyalty).to_json()
+            except ZeroDivisionError:
+                continue
+            res = {'message': grid['message'][i], 'success': grid['success'][i]}
+            if 'amounts' in exp:
+                res['black_box_cost'] = {key: grid['black_box_cost'][key][i]
+                                         for key in ('cur', 'max', 'min')}
+                for key in ('probabilities', 'amounts'):
+                    res[key] = {category: grid[key][category][i] for category in LOT_CATEGORIES}
+                res['loyalty'] = grid['loyalty'][i]
+                res['rentability'] = grid['rentability'][i]
+            self.assertEqual(res, exp, msg=f'{cost}, {rentability}, {loyalty}')
+
+    def test_grid_matches_util(self):
+        costs = [0, 100, 270, 300, 400, 460, 555.55, 760, 800]
+        rentabilities = [0, 0.05, 0.15, 0.2, 0.33, 1]
+        loyalties = [0, 0.1, 0.35, 0.6, 0.7, 0.99, 1]
+        self.assert_grid_matches_util({'costly': 1000, 'middle': 300, 'cheap': 100}, 100,
+                                      costs, rentabilities, loyalties)
+        self.assert_grid_matches_util({'costly': 305, 'middle': 300, 'cheap': 100}, 7,
+                                      costs, rentabilities, loyalties)
+        self.assert_grid_matches_util({'costly': 4e11, 'middle': 2e11, 'cheap': 1e11}, 10,
+                                      [0, 3e11], rentabilities, loyalties)
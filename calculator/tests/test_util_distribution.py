@@ -0,0 +1,71 @@
+from fractions import Fraction
+import unittest
+
+import numpy as np
+
+from calculator.utils.distribution import BoxDistribution
+from calculator.utils.simulation import simulate_openings
+
+
+def enumerate_openings(amounts, costs, price):
+    """probabilities of every category at every opening by walking all paths"""
+    n = sum(amounts)
+    res = [[Fraction(0)] * len(amounts) for _ in range(n)]
+
+    def walk(remaining, t, giveaway, probability):
+        if t == n:
+            return
+        options = [i for i, amount in enumerate(remaining)
+                   if amount > 0 and giveaway + costs[i] <= price * (t + 1)]
+        total = sum(remaining[i] for i in options)
+        for i in options:
+            p = probability * Fraction(remaining[i], total)
+            res[t][i] += p
+            walk(remaining[:i] + [remaining[i] - 1] + remaining[i + 1:],
+                 t + 1, giveaway + costs[i], p)
+
+    walk(list(amounts), 0, 0, Fraction(1))
+    return np.array(res, dtype=float)
+
+
+class DistributionTest(unittest.TestCase):
+    def test_matches_enumeration(self):
+        boxes = [
+            ([1, 2, 3], [300, 200, 100], 170),
+            ([2, 3, 4], [1000, 300, 100], 290),
+            ([2, 0, 3], [300, 200, 100], 150),
+            ([3, 3], [50, 10], 30),
+            ([1, 1, 2, 2], [500, 300, 200, 100], 220),
+        ]
+        for amounts, costs, price in boxes:
+            distribution = BoxDistribution(amounts, costs, price)
+            np.testing.assert_allclose(distribution.probabilities,
+                                       enumerate_openings(amounts, costs, price),
+                                       atol=1e-12)
+
+    def test_stuck_box(self):
+        distribution = BoxDistribution([1, 1, 1], [300, 200, 100], 50)
+        self.assertEqual(distribution.expected_openings(), 0)
+        distribution = BoxDistribution([1, 2, 3], [300, 200, 100], 170, n=2)
+        self.assertEqual(distribution.probabilities.tolist(), [[0, 0, 1], [0, 0.5, 0.5]])
+        self.assertAlmostEqual(distribution.expected_giveaway(), 250)
+
+    def test_size(self):
+        self.assertEqual(BoxDistribution.size([10, 20, 30]), 11 * 21 * 60)
+        self.assertEqual(BoxDistribution.size([10, 20, 30], n=5), 11 * 21 * 5)
+        self.assertEqual(BoxDistribution.size([10, 20, 30], n=100), 11 * 21 * 60)
+
+    def test_matches_sampling(self):
+        amounts, costs, price = [30, 90, 180], [1000, 300, 100], 250
+        distribution = BoxDistribution(amounts, costs, price)
+        rng = np.random.default_rng(42)
+        counts = np.zeros(3)
+        openings = []
+        for _ in range(500):
+            res = simulate_openings(300, amounts, costs, price, rng)
+            counts += np.bincount(res, minlength=3)
+            openings.append(len(res))
+        self.assertAlmostEqual(np.mean(openings), distribution.expected_openings(),
+                               delta=0.01 * distribution.expected_openings())
+        np.testing.assert_allclose(counts / 500, distribution.probabilities.sum(axis=0),
+                                   rtol=0.03)
@@ -1,8 +1,9 @@
 import unittest
+from math import ceil
 from random import seed
 from copy import deepcopy
 
-from calculator.utils.lottery import LotteryUtil
+from calculator.utils.lottery import LotteryUtil, LotterySession, LotteryOptimizer
 
 
 seed(42)
@@ -184,4 +185,104 @@ class LotteryTest(unittest.TestCase):
         r = lottery.to_json()
         self.assertFalse(r['success'])
         self.assertEqual(r['message'], 'Слишком большие значения, попробуйте уменьшить входные данные')
-        
\ No newline at end of file
+        
+
+class LotterySessionTest(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            'lots': [
+                {'amount': 1, 'price': 1000},
+                {'amount': 2, 'price': 500},
+                {'amount': 3, 'price': 200},
+            ],
+            'write_off': 1000,
+            'referral_coeff': 4,
+            'discount': 0.05,
+            'ticket_amount': 0,
+            'ticket_price': 0
+        }
+
+    def test_changes_match_full_recalculation(self):
+        session = LotterySession(**self.data)
+        self.assertTrue(session.apply([
+            {'field': 'amount', 'lot': 2, 'op': 'add', 'value': 5},
+            {'field': 'price', 'lot': 0, 'value': 700},
+        ]))
+        self.data['lots'][2]['amount'] = 8
+        self.data['lots'][0]['price'] = 700
+        self.assertEqual(session.to_json(), LotteryUtil(**self.data).to_json())
+
+        self.assertTrue(session.apply([{'field': 'ticket_amount', 'value': 30},
+                                       {'field': 'ticket_price', 'value': 150}]))
+        self.data['ticket_amount'], self.data['ticket_price'] = 30, 150
+        self.assertEqual(session.to_json(), LotteryUtil(**self.data).to_json())
+        self.assertEqual(session.total_amount, 11)
+        self.assertEqual(session.total_cost, 3300)
+
+    def test_invalid_changes_are_not_applied(self):
+        session = LotterySession(**self.data)
+        expected = session.to_json()
+        self.assertFalse(session.apply([
+            {'field': 'amount', 'lot': 0, 'value': 10},
+            {'field': 'discount', 'value': 2},
+        ]))
+        self.assertEqual(session.message, 'Error: discount must be a number between 0 and 1')
+        self.assertEqual(session.lot_amounts, [1, 2, 3])
+        self.assertTrue(session.apply([]))
+        self.assertEqual(session.to_json(), expected)
+
+    def test_unknown_lot(self):
+        session = LotterySession(**self.data)
+        self.assertFalse(session.apply([{'field': 'amount', 'lot': 3, 'value': 1}]))
+        self.assertEqual(session.message, 'Error: lot 3 does not exist')
+
+
+class LotteryOptimizerTest(unittest.TestCase):
+    def setUp(self):
+        self.data = {
+            'lots': [
+                {'amount': 1, 'price': 1000},
+                {'amount': 2, 'price': 500},
+                {'amount': 3, 'price': 200},
+            ],
+            'write_off': 1000,
+            'referral_coeff': 4,
+            'discount': 0.05,
+        }
+
+    def brute_force_front(self, optimizer):
+        min_amount, max_amount = optimizer.amount_range
+        min_price, max_price = optimizer.price_range
+        cost = optimizer.util.total_cost
+        feasible = [(a, p) for p in range(min_price, max_price + 1, 10)
+                    for a in range(min_amount, max_amount + 1)
+                    if a >= ceil(cost / p)
+                    and optimizer.util.get_profit(a, p) >= optimizer.required_profit]
+        front = [(a, p) for a, p in feasible
+                 if not any(a2 <= a and p2 <= p and (a2, p2) != (a, p) for a2, p2 in feasible)]
+        return sorted(front, key=lambda point: point[1])
+
+    def test_front_matches_brute_force(self):
+        for min_rentability in (0, 0.1, 0.5):
+            optimizer = LotteryOptimizer(**self.data, min_rentability=min_rentability)
+            self.assertTrue(optimizer.front)
+            self.assertEqual(optimizer.front, self.brute_force_front(optimizer))
+            lattice = (optimizer.price_range[1] - optimizer.price_range[0]) // 10 \
+                * (optimizer.amount_range[1] - optimizer.amount_range[0])
+            self.assertLess(optimizer.evaluations, lattice / 10)
+
+    def test_best_point(self):
+        r = LotteryOptimizer(**self.data, objective='min_rentability', min_rentability=0.1).to_json()
+        self.assertTrue(r['success'])
+        self.assertEqual(r['best'], max(r['front'], key=lambda point: point['min_rentability']))
+        for point in r['front']:
+            self.assertGreaterEqual(point['min_profit'], 260)
+            lottery = LotteryUtil(**self.data, ticket_amount=point['ticket_amount'],
+                                  ticket_price=point['ticket_price']).to_json()
+            self.assertEqual(lottery['min_profit'], point['min_profit'])
+            self.assertEqual(lottery['ticket_amount']['cur'], point['ticket_amount'])
+
+    def test_unreachable_rentability(self):
+        r = LotteryOptimizer(**self.data, min_rentability=100).to_json()
+        self.assertFalse(r['success'])
+        self.assertEqual(r['message'], 'Нет цены и количества билетов с заданной рентабельностью')
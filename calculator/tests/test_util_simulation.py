@@ -0,0 +1,81 @@
+from collections import Counter
+import unittest
+
+import numpy as np
+
+from calculator.utils.rng import resolve_seed, spawn_rngs, sample_without_replacement
+from calculator.utils.simulation import BoxSimulation, simulate_openings, to_cents
+
+
+class SimulationTest(unittest.TestCase):
+    def test_to_cents(self):
+        self.assertEqual(to_cents(170), 17000)
+        self.assertEqual(to_cents(0.1), 10)
+        self.assertEqual(to_cents('12.345'), 1235)
+
+    def test_zero_openings(self):
+        res = simulate_openings(0, [1, 1, 1], [300, 200, 100], 170)
+        self.assertEqual(len(res), 0)
+
+    def test_budget_is_never_exceeded(self):
+        rng = np.random.default_rng(42)
+        costs = [300, 200, 100]
+        for _ in range(100):
+            res = simulate_openings(6, [1, 2, 3], costs, 170, rng)
+            total_giveaway = 0
+            for i, item in enumerate(res):
+                total_giveaway += costs[item]
+                self.assertLessEqual(total_giveaway, (i + 1) * 170)
+
+    def test_box_is_emptied(self):
+        rng = np.random.default_rng(42)
+        amounts = [1000, 3000, 6000]
+        res = simulate_openings(10 ** 5, amounts, [1000, 300, 100], 290, rng)
+        self.assertEqual(Counter(res.tolist()), Counter({0: 1000, 1: 3000, 2: 6000}))
+
+    def test_stops_when_nothing_is_affordable(self):
+        res = simulate_openings(10, [1, 1, 1], [300, 200, 100], 50)
+        self.assertEqual(len(res), 0)
+
+    def test_matches_sequential_distribution(self):
+        # first opening can only be cheap, the second one is middle or cheap
+        # with weights 2:2
+        rng = np.random.default_rng(42)
+        second = Counter()
+        for _ in range(2000):
+            res = simulate_openings(2, [1, 2, 3], [300, 200, 100], 170, rng)
+            self.assertEqual(res[0], 2)
+            second[int(res[1])] += 1
+        self.assertEqual(set(second), {1, 2})
+        self.assertAlmostEqual(second[1] / 2000, 0.5, delta=0.05)
+
+    def test_seed_repeats_run(self):
+        first = BoxSimulation([100, 300, 600], [1000, 300, 100], 290)
+        res = simulate_openings(1000, [100, 300, 600], [1000, 300, 100], 290, seed=first.seed)
+        self.assertEqual(np.concatenate(list(first.run(1000))).tolist(), res.tolist())
+        self.assertNotEqual(resolve_seed(), resolve_seed())
+        self.assertEqual(resolve_seed(42), 42)
+
+    def test_spawned_streams(self):
+        first = [rng.integers(10 ** 9, size=5).tolist() for rng in spawn_rngs(42, 3)]
+        second = [rng.integers(10 ** 9, size=5).tolist() for rng in spawn_rngs(42, 3)]
+        self.assertEqual(first, second)
+        self.assertEqual(len({tuple(stream) for stream in first}), 3)
+
+    def test_sample_without_replacement(self):
+        rng = np.random.default_rng(42)
+        res = sample_without_replacement(10 ** 15, 1000, rng)
+        self.assertEqual(len(set(res.tolist())), 1000)
+        self.assertEqual(res.tolist(), sorted(res.tolist()))
+        self.assertTrue(0 <= res[0] and res[-1] < 10 ** 15)
+        self.assertEqual(sample_without_replacement(5, 5, rng).tolist(), [0, 1, 2, 3, 4])
+        with self.assertRaises(ValueError):
+            sample_without_replacement(3, 4, rng)
+
+    def test_sample_is_uniform(self):
+        rng = np.random.default_rng(42)
+        pairs = Counter(tuple(sample_without_replacement(5, 2, rng).tolist())
+                        for _ in range(10000))
+        self.assertEqual(len(pairs), 10)
+        for count in pairs.values():
+            self.assertAlmostEqual(count / 10000, 0.1, delta=0.015)
@@ -0,0 +1,44 @@
+import unittest
+
+import numpy as np
+
+from calculator.utils.distribution import BoxDistribution
+from calculator.utils.trajectories import TrajectoryStats, simulate_trajectories,\
+    SHARD_RUNS
+
+
+class TrajectoriesTest(unittest.TestCase):
+    def test_matches_exact_distribution(self):
+        amounts, costs, price = [3, 6, 12], [1000, 300, 100], 200
+        seed, stats = simulate_trajectories(amounts, costs, price, 1000, seed=42)
+        self.assertEqual(seed, 42)
+        self.assertEqual(stats.runs, 1000)
+        distribution = BoxDistribution(amounts, costs, price)
+        np.testing.assert_allclose(stats.category_counts / 1000,
+                                   distribution.probabilities, atol=0.06)
+        data = stats.to_json(('costly', 'middle', 'cheap'))
+        self.assertAlmostEqual(data['openings']['mean'], distribution.expected_openings(),
+                               delta=0.3)
+        quantiles = list(data['openings']['quantiles'].values())
+        self.assertEqual(quantiles, sorted(quantiles))
+        self.assertEqual(len(data['payout']['mean']), sum(amounts))
+
+    def test_pool_gives_the_same_result(self):
+        args = [2, 4, 8], [1000, 300, 100], 250, 2 * SHARD_RUNS + 5
+        _, local = simulate_trajectories(*args, seed=7)
+        _, pooled = simulate_trajectories(*args, seed=7, pool_threshold=1, max_workers=2)
+        self.assertEqual(local.to_json('abc'), pooled.to_json('abc'))
+
+    def test_stats(self):
+        stats = TrajectoryStats(3, 2)
+        costs = np.array([200, 100])
+        stats.add(np.array([1, 0, 1]), costs, 150)
+        other = TrajectoryStats(3, 2)
+        other.add(np.array([1]), costs, 150)
+        data = stats.merge(other).to_json(('costly', 'cheap'))
+        self.assertEqual(data['openings']['mean'], 2)
+        self.assertEqual(data['openings']['quantiles']['0.05'], 1)
+        self.assertEqual(data['openings']['quantiles']['0.95'], 3)
+        self.assertEqual(data['payout']['mean'], [1, 2, 2.5])
+        self.assertEqual(data['profit'], {'mean': 0.5, 'std': 0})
+        self.assertEqual(data['probabilities'], {'costly': [0, 0.5, 0], 'cheap': [1, 0, 0.5]})
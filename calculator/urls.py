@@ -1,3 +1,4 @@
+from django.urls import path
 from rest_framework.routers import DefaultRouter
 
 from calculator.views.products import ProductViewSet
@@ -8,6 +9,10 @@ from calculator.views.lottery import LotteryViewSet
 
 from calculator.views.bingo import BingoViewSet, BoosterViewSet
 
+from calculator.views.cache import CalculateCacheView
+
+from calculator.views.profiling import ProfilingView
+
 
 router = DefaultRouter()
 router.register('product', ProductViewSet)
@@ -16,4 +21,7 @@ router.register('lottery', LotteryViewSet)
 router.register('bingo-discount', BingoViewSet)
 router.register('bingo-booster', BoosterViewSet)
 
-urlpatterns = router.urls
+urlpatterns = router.urls + [
+    path('calculate-cache/', CalculateCacheView.as_view(), name='calculate-cache'),
+    path('profiling/', ProfilingView.as_view(), name='profiling'),
+]
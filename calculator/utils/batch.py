@@ -0,0 +1,27 @@
+from functools import partial
+from typing import Dict, Iterable, List, Optional
+
+from calculator.utils.pool import MAX_WORKERS, process_pool
+
+
+POOL_THRESHOLD = 200
+
+
+def run_util(util_class, data: Dict) -> Dict:
+    try:
+        return util_class(**data).to_json()
+    except (ArithmeticError, TypeError, ValueError) as e:
+        # a single bad configuration must not fail the whole batch
+        return {'success': False, 'message': f'Error: {e!r}'}
+
+
+def run_batch(util_class, items: Iterable[Dict],
+              pool_threshold: int = POOL_THRESHOLD,
+              max_workers: Optional[int] = None) -> List[Dict]:
+    """run util_class on every item, in the shared process pool for large batches"""
+    items = [dict(item) for item in items]
+    if len(items) < pool_threshold:
+        return [run_util(util_class, item) for item in items]
+    chunksize = max(1, len(items) // (4 * MAX_WORKERS))
+    pool = process_pool(max_workers)
+    return list(pool.map(partial(run_util, util_class), items, chunksize=chunksize))
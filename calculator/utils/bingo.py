@@ -1,8 +1,12 @@
-from typing import List, Union
+from typing import List, Optional, Union
 from decimal import Decimal
-from math import sqrt
+from math import floor, sqrt
 from operator import itemgetter
 
+import numpy as np
+
+from calculator.utils.timing import timed
+
 
 BOOSTER_VALUES = (2, 3, 1.5, 2.5, 1.25, 1.75, 2.25, 2.75,)
 
@@ -10,17 +14,18 @@ BOOSTER_VALUES = (2, 3, 1.5, 2.5, 1.25, 1.75, 2.25, 2.75,)
 class BingoUtil:
     @staticmethod
     def round_preserving_sum(amounts: List[Union[Decimal, float]]) -> List[int]:
-        spare_amount = 0
-        res = []
-        for amount in amounts:
-            if int(amount) == amount:
-                res.append(int(amount))
-            elif int(amount) + 1 - amount <= Decimal(spare_amount) + Decimal(1e-2):
-                spare_amount -= int(amount) + 1 - amount
-                res.append(int(amount + 1))
-            else:
-                spare_amount += amount - int(amount)
-                res.append(int(amount))
+        """
+        Largest remainder rounding: every amount is floored and the ones with
+        the largest fractional parts (later ones on ties) get one more, so the
+        result sums to sum(amounts) rounded half up, whatever its parity.
+        Decimal amounts are rounded exactly.
+        """
+        res = [floor(amount) for amount in amounts]
+        total = sum(amounts)
+        extra = floor(total) + (total - floor(total) >= 0.5) - sum(res)
+        order = sorted(range(len(amounts)), key=lambda i: (amounts[i] - res[i], i), reverse=True)
+        for i in order[:max(extra, 0)]:
+            res[i] += 1
         return res
 
 
@@ -131,7 +136,101 @@ class MiniBingoUtil:
         return spare_budget, spare_amount
 
 
+class MiniBingoArrayUtil:
+    """
+    MiniBingoUtil for every lot at once, one lot per row.
+    Sums are accumulated left to right like in MiniBingoUtil, so the amounts
+    are the same. If some lot hits a float error or a failed check the lots
+    are solved one by one with MiniBingoUtil instead.
+    """
+    @timed()
+    def __init__(self, prices: List[float], discounts: List[List[float]],
+                 budgets: List[float], lucky_participants: List[int]):
+        self.lots = list(zip(prices, discounts, budgets, lucky_participants))
+        self.amounts = self.get_amounts()
+
+    def get_amounts(self) -> List[List[int]]:
+        amounts = None
+        if self.lots:
+            prices, discounts, budgets, lucky_participants = zip(*self.lots)
+            self.prices = np.array(prices, dtype=float)
+            self.discounts = np.array(discounts, dtype=float)
+            self.budgets = np.array(budgets, dtype=float)
+            self.lucky_participants = np.array(lucky_participants, dtype=float)
+            if self.discounts.ndim == 2 and self.discounts.shape[1] >= 2:
+                try:
+                    with np.errstate(divide='raise', over='raise', invalid='raise'):
+                        amounts = self.round_wo_exceeding_budget(self.get_unadjusted_amounts())
+                except FloatingPointError:
+                    amounts = None
+        if amounts is None:
+            return [MiniBingoUtil(*lot).amounts for lot in self.lots]
+        return amounts.tolist()
+
+    def get_unadjusted_amounts(self) -> np.ndarray:
+        p, d, b, lp = self.prices, self.discounts, self.budgets, self.lucky_participants
+        low = b < p * lp * d[:, 0]
+        high = ~low & (b > p * lp * d[:, -1])
+        normal = ~low & ~high
+        amounts = np.zeros_like(d)
+        amounts[low, 0] = np.trunc(b[low] / (d[low, 0] * p[low]))
+        amounts[high, -1] = lp[high]
+        if normal.any():
+            amounts[normal] = self.solve_amounts_normal_budget(
+                p[normal], d[normal], b[normal], lp[normal])
+        return amounts
+
+    def solve_amounts_normal_budget(self, p, d, b, lp):
+        reverse = (b >= self.get_threshold(p, d, lp))[:, None]
+        solution = self.apply_formulae(p, np.where(reverse, d[:, ::-1], d), b, lp)
+        return np.where(reverse, solution[:, ::-1], solution)
+
+    @staticmethod
+    def apply_formulae(p, d, b, lp):
+        roots = np.sqrt(d[:, 1:])
+        sum_sq_roots = np.cumsum(roots, axis=1)[:, -1]
+        sum_rev_sq_roots = np.cumsum(1 / roots, axis=1)[:, -1]
+        denominator = sum_sq_roots - d[:, 0] * sum_rev_sq_roots
+        first = (lp * sum_sq_roots - b / p * sum_rev_sq_roots) / denominator
+        second = (b / p - lp * d[:, 0]) / (denominator * roots[:, 0])
+        rest = second[:, None] * np.sqrt(d[:, 1:2] / d[:, 2:])
+        return np.column_stack([first, second, rest])
+
+    @staticmethod
+    def get_threshold(p, d, lp):
+        roots = np.sqrt(d)
+        roots_sum = np.cumsum(roots, axis=1)[:, -1]
+        reverse_roots_sum = np.cumsum(1 / roots, axis=1)[:, -1]
+        return p * lp * roots_sum / reverse_roots_sum
+
+    def round_wo_exceeding_budget(self, amounts: np.ndarray) -> Optional[np.ndarray]:
+        p, d = self.prices, self.discounts
+        if not np.all(p * np.cumsum(d * amounts, axis=1)[:, -1] - self.budgets <= 1e-2):
+            return None
+        spare_budget = np.zeros(len(p))
+        spare_amount = np.zeros(len(p))
+        res = np.empty(amounts.shape, dtype=np.int64)
+        for i in reversed(range(amounts.shape[1])):
+            amount, discount = amounts[:, i], d[:, i]
+            whole = np.trunc(amount)
+            fractional = whole != amount
+            up = whole + 1 - amount
+            down = amount - whole
+            ceil = (fractional & (up * discount * p <= spare_budget + 1e-2)
+                    & (up <= spare_amount + 1e-2))
+            floor = fractional & ~ceil
+            spare_budget = np.where(ceil, spare_budget - up * discount * p, spare_budget)
+            spare_amount = np.where(ceil, spare_amount - up, spare_amount)
+            spare_budget = np.where(floor, spare_budget + down * discount * p, spare_budget)
+            spare_amount = np.where(floor, spare_amount + down, spare_amount)
+            res[:, i] = np.where(ceil, np.trunc(amount + 1), whole)
+            if not np.all(spare_budget >= -1e-2):
+                return None
+        return res
+
+
 class DiscountBingoUtil(BingoUtil):
+    @timed()
     def __init__(self, prices: List[Decimal], discounts: List[Decimal],
                  budget: Decimal, lucky_participants: int,
                  usage_probability: Decimal, unlucky_participants: Decimal,
@@ -188,17 +287,12 @@ class DiscountBingoUtil(BingoUtil):
         return self.round_preserving_sum(not_rounded_aml)
 
     def get_amounts(self):
-        solutions = [self.get_amounts_for_single_lot(budget, participant_amount, price)
-                     for budget, participant_amount, price
-                     in zip(self.abs_budget_distribution,
-                            self.participants_per_lot, self.prices)]
+        solutions = MiniBingoArrayUtil(self.prices, [self.discounts] * self.n,
+                                       self.abs_budget_distribution,
+                                       self.participants_per_lot).amounts
         self.participants_per_lot = [sum(sol) for sol in solutions]
         return solutions
 
-    def get_amounts_for_single_lot(self, budget, participant_amount, price):
-        mini_bingo = MiniBingoUtil(price, self.discounts, budget, participant_amount)
-        return mini_bingo.amounts
-
     def get_unlucky_participants(self):
         return 0
 
@@ -224,6 +318,7 @@ class DiscountBingoUtil(BingoUtil):
 
 
 class BoosterBingoUtil(BingoUtil):
+    @timed()
     def __init__(self, prices: List[Decimal], booster_amount: int,
                  fix_amount: int, budget: Decimal, participants: int,
                  abs_budget_distribution: List[Decimal]):
@@ -301,12 +396,9 @@ class BoosterBingoUtil(BingoUtil):
         return discounts, orders
 
     def get_amounts(self):
-        solutions = []
-        for participant_amount, price, budget, discounts \
-                in zip(self.participants_per_lot, self.prices,
-                       self.abs_budget_distribution, self.discounts):
-            mini_bingo = MiniBingoUtil(price, discounts, budget, participant_amount)
-            solutions.append(mini_bingo.amounts)
+        solutions = MiniBingoArrayUtil(self.prices, self.discounts,
+                                       self.abs_budget_distribution,
+                                       self.participants_per_lot).amounts
         self.participants_per_lot = [sum(sol) for sol in solutions]
         return solutions
 
@@ -3,6 +3,10 @@ from typing import Dict, Iterable, List, Optional
 from random import choices
 from decimal import Decimal
 
+import numpy as np
+
+from calculator.utils.timing import timed
+
 
 PROFIT = 0.15
 LOYALTY = 0.6
@@ -11,6 +15,7 @@ LOT_CATEGORIES = ('costly', 'middle', 'cheap')
 
 
 class BlackBoxUtil:
+    @timed()
     def __init__(self, lot_cost: Dict[str, float],  costly_amount: int,
                  black_box_cost: float, rentability: float = PROFIT,
                  loyalty: float = LOYALTY):
@@ -143,6 +148,153 @@ class BlackBoxUtil:
         return floor(price / 10) * 10
 
 
+class BlackBoxGridUtil:
+    """
+    BlackBoxUtil evaluated over the cartesian product of black box costs,
+    rentabilities and loyalties. The result is columnar: every leaf of
+    BlackBoxUtil.to_json() becomes a list with one value per grid point.
+    """
+    @timed()
+    def __init__(self, lot_cost: Dict[str, float], costly_amount: int,
+                 black_box_cost: List[float], rentability: List[float],
+                 loyalty: List[float]):
+        self.prices = [float(lot_cost[category]) for category in LOT_CATEGORIES]
+        self.max_count_costly = costly_amount
+        grid = np.meshgrid(np.array(black_box_cost, dtype=float),
+                           np.array(rentability, dtype=float),
+                           np.array(loyalty, dtype=float), indexing='ij')
+        self.black_box_cost, self.profit, self.loyalty = (axis.ravel() for axis in grid)
+        self.min_price = self.get_min_price()
+        self.max_price = self.get_max_price()
+        self.set_price()
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.probabilities = self.get_probabilities()
+            self.amounts = self.get_amounts()
+            self.update_probabilities()
+
+    def to_json(self):
+        max_p = np.floor(self.max_price / 10) * 10
+        min_p = np.ceil(self.min_price / 10) * 10
+        close_prices = max_p < min_p
+        finite = np.isfinite(self.amounts).all(axis=0)
+        too_large = (self.ticket_price >= 1e10)\
+            | (np.where(finite, self.amounts, 0) >= 1e10).any(axis=0)
+        valid = ~close_prices & finite & ~too_large
+        total = np.where(valid, self.amounts.sum(axis=0), 1)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            loyalty = (self.amounts[0] + self.amounts[1]) / total
+            expected_value = sum(a * round(c, 3) for a, c in zip(self.amounts, self.prices)) / total
+            rentability = np.minimum(self.ticket_price / expected_value - 1, 1)
+
+        message = [
+            self.get_message(*row) for row
+            in zip(close_prices.tolist(), (finite & ~too_large).tolist(),
+                   self.recalculated.tolist(), min_p.tolist(), max_p.tolist())
+        ]
+        data = {
+            'black_box_cost': {
+                'input': self.black_box_cost.tolist(),
+                'cur': column(self.ticket_price, valid),
+                'max': column(max_p, valid, int),
+                'min': column(min_p, valid, int),
+            },
+            'rentability_input': self.profit.tolist(),
+            'loyalty_input': self.loyalty.tolist(),
+            'probabilities': {category: column(p, valid, digits=3)
+                              for category, p in zip(LOT_CATEGORIES, self.probabilities)},
+            'amounts': {category: column(a, valid, int)
+                        for category, a in zip(LOT_CATEGORIES, self.amounts)},
+            'loyalty': column(loyalty, valid, digits=2),
+            'rentability': column(rentability, valid, digits=2),
+            'message': message,
+            'success': (close_prices | valid).tolist(),
+        }
+        return data
+
+    @staticmethod
+    def get_message(close_prices, valid_size, recalculated, min_p, max_p):
+        if close_prices:
+            return 'Цены дорогого и среднего лотов ' \
+                   'отличаются на слишком маленькую величину.'
+        if not valid_size:
+            return 'Слишком большие значения, попробуйте уменьшить входные данные'
+        if recalculated:
+            return f'С новыми значениями констант цена должна ' \
+                   f'лежать в интервале от {int(min_p)} ' \
+                   f'до {int(max_p)}, поэтому она была перерасчитана.'
+        return ''
+
+    def get_max_price(self):
+        return rounded((self.profit + 1)
+                       * (self.loyalty * self.prices[0]
+                          - self.loyalty * self.prices[2] + self.prices[2]),
+                       2)
+
+    def get_min_price(self):
+        res = rounded((self.profit + 1)
+                      * (self.loyalty * self.prices[1]
+                         - self.loyalty * self.prices[2] + self.prices[2]),
+                      2)
+        return np.where(self.profit == 0, res + 10, res)
+
+    def set_price(self):
+        optimal = np.ceil(np.sqrt(self.min_price * self.max_price) / 10) * 10
+        in_range = (self.min_price <= self.black_box_cost) & (self.black_box_cost <= self.max_price)
+        self.recalculated = (self.black_box_cost != 0) & ~in_range
+        self.ticket_price = np.where((self.black_box_cost == 0) | self.recalculated,
+                                     optimal, self.black_box_cost)
+
+    def get_probabilities(self):
+        p3 = 1 - self.loyalty
+        p1 = (self.ticket_price / (self.profit + 1)
+              - self.loyalty * (self.prices[1] - self.prices[2])
+              - self.prices[2])\
+            / (self.prices[0] - self.prices[1])
+        p2 = self.loyalty - p1
+        return p1, p2, p3
+
+    def get_amounts(self):
+        a1 = self.max_count_costly
+        p1, p2, p3 = self.probabilities
+        no_costly = np.abs(p1) < 1e-4
+        middle_first = p2 >= p3
+        costly = np.where(no_costly, 0, a1)
+        middle = np.where(no_costly,
+                          np.where(middle_first, a1, np.floor(a1 * p2 / p3)),
+                          np.ceil(a1 * p2 / p1))
+        cheap = np.where(no_costly,
+                         np.where(middle_first, np.ceil(a1 * p3 / p2), a1),
+                         np.ceil(a1 * p3 / p1))
+        return np.array([costly, middle, cheap], dtype=float)
+
+    def update_probabilities(self):
+        total_amount = self.amounts.sum(axis=0)
+        self.probabilities = self.amounts / total_amount
+
+
+def rounded(values: np.ndarray, digits: int) -> np.ndarray:
+    """
+    Elementwise builtin round. np.round scales by 10 ** digits first and may
+    break ties differently, so values close to a tie are rounded one by one.
+    """
+    res = np.round(values, digits)
+    scaled = values * 10.0 ** digits
+    with np.errstate(invalid='ignore'):
+        near_tie = np.flatnonzero(np.abs(scaled - np.floor(scaled) - 0.5) < 1e-6)
+    res[near_tie] = [round(value, digits) for value in values[near_tie].tolist()]
+    return res
+
+
+def column(values: np.ndarray, mask: np.ndarray, cast=float,
+           digits: Optional[int] = None) -> List:
+    if digits is not None:
+        values = rounded(values, digits)
+    if mask.all():
+        return values.astype(cast).tolist()
+    return [cast(value) if ok else None
+            for value, ok in zip(values.tolist(), mask.tolist())]
+
+
 def convert_to_dict(it: Iterable) -> Dict:
     return {key: round(value, 3) for key, value in zip(LOT_CATEGORIES, it)}
 
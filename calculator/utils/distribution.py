@@ -0,0 +1,91 @@
+from math import prod
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+
+from calculator.utils.simulation import to_cents
+
+
+class BoxDistribution:
+    """
+    Exact distribution of the openings of a black box under the get_item rule.
+
+    The giveaway is fixed by how many items of each category were taken, so the
+    chain lives on the taken counts. The states after t openings are kept as an
+    array indexed by the counts of every category but the last one (the last
+    one is t minus the rest), and every layer only touches the box of counts
+    reachable in t openings. Mass of states where nothing is affordable or the
+    box is empty leaves the chain.
+    """
+    def __init__(self, amounts: Sequence[int], costs: Sequence, box_price,
+                 n: Optional[int] = None):
+        self.amounts = [int(amount) for amount in amounts]
+        self.costs = [to_cents(cost) for cost in costs]
+        self.price = to_cents(box_price)
+        self.k = len(self.amounts)
+        total = sum(self.amounts)
+        self.n = total if n is None else min(n, total)
+        self.probabilities = self.solve()
+
+    @staticmethod
+    def size(amounts: Sequence[int], n: Optional[int] = None) -> int:
+        """states times openings, the work solve() does for a box"""
+        amounts = [int(amount) for amount in amounts]
+        total = sum(amounts)
+        n = total if n is None else min(n, total)
+        return prod(a + 1 for a in amounts[:-1]) * n
+
+    def solve(self) -> np.ndarray:
+        """probabilities[t, i]: opening t + 1 happens and gives category i"""
+        *head, last = self.amounts
+        head_costs = np.array(self.costs[:-1], dtype=np.int64)
+        probabilities = np.zeros((self.n, self.k))
+        states = np.zeros([a + 1 for a in head])
+        states[(0,) * len(head)] = 1
+        all_taken = np.indices(states.shape, dtype=np.int64)
+        all_taken_sum = all_taken.sum(axis=0)
+        all_giveaway = np.tensordot(head_costs, all_taken, axes=1)
+        for t in range(self.n):
+            box = tuple(slice(0, min(a, t) + 1) for a in head)
+            current = states[box]
+            taken = all_taken[(slice(None),) + box]
+            taken_last = t - all_taken_sum[box]
+            alive = (current > 0) & (taken_last >= 0) & (taken_last <= last)
+            giveaway = all_giveaway[box] + taken_last * self.costs[-1]
+            slack = self.price * (t + 1) - giveaway
+            remaining = [a - c for a, c in zip(head, taken)] + [last - taken_last]
+            weights = [np.where(alive & (r > 0) & (cost <= slack), r, 0)
+                       for r, cost in zip(remaining, self.costs)]
+            total = sum(weights)
+            share = np.divide(current, total, out=np.zeros_like(current), where=total > 0)
+            following = np.zeros_like(states)
+            following[box] += share * weights[-1]
+            probabilities[t, -1] = following.sum()
+            for i, weight in enumerate(weights[:-1]):
+                moved = share * weight
+                probabilities[t, i] = moved.sum()
+                # taking category i moves the mass one step along axis i,
+                # states with nothing of it left have zero weight
+                size = min(current.shape[i], head[i])
+                source = tuple(slice(0, size) if axis == i else slice(None)
+                               for axis in range(len(head)))
+                target = tuple(slice(1, size + 1) if axis == i else part
+                               for axis, part in enumerate(box))
+                following[target] += moved[source]
+            states = following
+        return probabilities
+
+    def expected_openings(self) -> float:
+        return float(self.probabilities.sum())
+
+    def expected_giveaway(self) -> float:
+        return float(self.probabilities.sum(axis=0) @ np.array(self.costs)) / 100
+
+    def to_json(self, categories: Sequence[str]) -> Dict:
+        probabilities = self.probabilities
+        return {
+            'probabilities': dict(zip(categories, probabilities.T.tolist())),
+            'expected_counts': dict(zip(categories, probabilities.sum(axis=0).tolist())),
+            'expected_openings': self.expected_openings(),
+            'expected_giveaway': self.expected_giveaway(),
+        }
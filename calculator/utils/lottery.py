@@ -1,8 +1,12 @@
 from math import floor, ceil
-from typing import List, Dict
+from operator import itemgetter
+from typing import Callable, List, Dict, Optional, Tuple
+
+from calculator.utils.timing import timed
 
 
 class LotteryUtil:
+    @timed()
     def __init__(self, lots: List[Dict[str, int]], write_off: float,
                  ticket_amount: int, ticket_price: float,
                  referral_coeff, discount):
@@ -13,10 +17,15 @@ class LotteryUtil:
             return
         self.lot_amounts = [lot['amount'] for lot in lots]
         self.lot_prices = [lot['price'] for lot in lots]
+        self.total_amount = sum(self.lot_amounts)
+        self.total_cost = self.get_total_cost()
+        self.calculate(write_off, ticket_amount, ticket_price, referral_coeff, discount)
+
+    def calculate(self, write_off, ticket_amount, ticket_price, referral_coeff, discount):
+        """everything that depends on the lots only through their totals"""
         self.write_off = write_off
         self.set_referral_coeff(referral_coeff)
         self.discount = discount
-        self.total_cost = self.get_total_cost()
         self.set_ticket_amount(ticket_amount, ticket_price)
         self.set_ticket_price(ticket_price)
         self.min_profit = self.get_min_profit()
@@ -64,12 +73,19 @@ class LotteryUtil:
     def validate(self, lots, write_off, referral_coeff,
                  discount, ticket_amount, ticket_price):
         for lot in lots:
-            if lot['amount'] < 0:
-                self.message = 'Error: lot amount < 0'
-                self.success = False
-            if lot['price'] < 0:
-                self.message = 'Error: lot price < 0'
-                self.success = False
+            self.validate_lot(lot['amount'], lot['price'])
+        self.validate_params(write_off, referral_coeff, discount, ticket_amount, ticket_price)
+
+    def validate_lot(self, amount, price):
+        if amount < 0:
+            self.message = 'Error: lot amount < 0'
+            self.success = False
+        if price < 0:
+            self.message = 'Error: lot price < 0'
+            self.success = False
+
+    def validate_params(self, write_off, referral_coeff,
+                        discount, ticket_amount, ticket_price):
         if write_off < 0:
             self.message = 'Error: write_off < 0'
             self.success = False
@@ -126,7 +142,7 @@ class LotteryUtil:
             self.referral_coeff = referral_coeff
 
     def get_ticket_amount(self):
-        return 4 * sum(self.lot_amounts)
+        return 4 * self.total_amount
 
     def get_total_cost(self):
         return sum(a * c for a, c in zip(self.lot_amounts, self.lot_prices))
@@ -135,9 +151,12 @@ class LotteryUtil:
         return self.round_up((self.write_off + self.total_cost) / self.ticket_amount)
 
     def get_min_profit(self):
-        factor1 = self.ticket_amount - floor(self.ticket_amount / (self.referral_coeff + 1))
+        return self.get_profit(self.ticket_amount, self.ticket_price)
+
+    def get_profit(self, ticket_amount, ticket_price):
+        factor1 = ticket_amount - floor(ticket_amount / (self.referral_coeff + 1))
         factor2 = 1 - self.discount
-        factor3 = self.ticket_price
+        factor3 = ticket_price
         deduction = self.total_cost
         return factor1 * factor2 * factor3 - deduction
 
@@ -151,10 +170,10 @@ class LotteryUtil:
         return self.ticket_amount * self.ticket_price - self.total_cost
 
     def get_min_ticket_amount(self, price):
-        return max(ceil(self.total_cost / price), sum(self.lot_amounts))
+        return max(ceil(self.total_cost / price), self.total_amount)
 
     def get_cur_min_ticket_amount(self):
-        return max(ceil(self.total_cost / self.ticket_price), sum(self.lot_amounts))
+        return max(ceil(self.total_cost / self.ticket_price), self.total_amount)
 
     def get_cur_max_ticket_amount(self):
         min_ta = self.get_cur_min_ticket_amount()
@@ -173,6 +192,177 @@ class LotteryUtil:
         return ceil(price / 10) * 10
 
 
+class LotterySession(LotteryUtil):
+    """
+    LotteryUtil kept between the requests of the lottery editor. The lot
+    totals are running sums, so a change of one lot or parameter is O(1).
+    """
+    LOT_FIELDS = ('amount', 'price')
+    PARAMS = ('write_off', 'ticket_amount', 'ticket_price', 'referral_coeff', 'discount')
+
+    def __init__(self, lots: List[Dict[str, int]], write_off: float,
+                 ticket_amount: int, ticket_price: float,
+                 referral_coeff=0, discount=0):
+        self.params = {
+            'write_off': write_off,
+            'ticket_amount': ticket_amount,
+            'ticket_price': ticket_price,
+            'referral_coeff': referral_coeff,
+            'discount': discount,
+        }
+        super().__init__(lots, **self.params)
+
+    def apply(self, changes: List[Dict]) -> bool:
+        """
+        Apply changes like {'field': 'amount', 'lot': 3, 'op': 'add', 'value': 5}
+        or {'field': 'ticket_price', 'value': 150} all at once, or none of them
+        if the result is invalid.
+        """
+        self.message = ''
+        self.success = True
+        params = dict(self.params)
+        lots = {}
+        for change in changes:
+            field, value = change['field'], change['value']
+            if field in self.LOT_FIELDS:
+                i = change['lot']
+                if not 0 <= i < len(self.lot_amounts):
+                    self.message = f'Error: lot {i} does not exist'
+                    self.success = False
+                    return False
+                lot = lots.setdefault(i, {'amount': self.lot_amounts[i],
+                                          'price': self.lot_prices[i]})
+                lot[field] = lot[field] + value if change.get('op') == 'add' else value
+            else:
+                params[field] = params[field] + value if change.get('op') == 'add' else value
+        self.validate(lots.values(), **params)
+        if not self.success:
+            return False
+        for i, lot in lots.items():
+            self.total_amount += lot['amount'] - self.lot_amounts[i]
+            self.total_cost += lot['amount'] * lot['price'] - self.lot_amounts[i] * self.lot_prices[i]
+            self.lot_amounts[i], self.lot_prices[i] = lot['amount'], lot['price']
+        self.params = params
+        self.calculate(**params)
+        return True
+
+
+class LotteryOptimizer:
+    """
+    Pareto front of the (ticket_price, ticket_amount) lattice: lotteries with
+    the cheapest tickets and the fewest of them (the best odds) whose min_profit
+    is at least min_rentability * total_cost. The profit grows with both the
+    price and the amount, so for every price the smallest amount is found by
+    binary search and prices that can't beat the previous amount are skipped.
+    """
+    OBJECTIVES = ('min_profit', 'min_rentability', 'max_rentability')
+    PRICE_STEP = 10
+
+    @timed()
+    def __init__(self, lots: List[Dict[str, int]], write_off: float,
+                 referral_coeff=0, discount=0, objective: str = 'min_profit',
+                 min_rentability=0, min_ticket_amount: Optional[int] = None,
+                 max_ticket_amount: Optional[int] = None,
+                 min_ticket_price: Optional[float] = None,
+                 max_ticket_price: Optional[float] = None):
+        self.util = LotteryUtil(lots, write_off, 0, 0, referral_coeff, discount)
+        self.message = self.util.message
+        self.success = self.util.success
+        self.evaluations = 0
+        if not self.success:
+            return
+        self.write_off = write_off
+        self.referral_coeff = referral_coeff
+        self.discount = discount
+        self.objective = objective
+        self.required_profit = min_rentability * self.util.total_cost
+        self.amount_range = (
+            max(min_ticket_amount or 0, self.util.total_amount),
+            max_ticket_amount or self.util.get_cur_max_ticket_amount(),
+        )
+        self.price_range = (
+            LotteryUtil.round_up(max(min_ticket_price or 0, self.util.get_cur_min_ticket_price())),
+            floor((max_ticket_price or self.util.get_cur_max_ticket_price()) / self.PRICE_STEP)
+            * self.PRICE_STEP,
+        )
+        self.front = self.get_front()
+
+    def to_json(self):
+        if not self.success:
+            return {
+                'success': False,
+                'message': self.message
+            }
+        if not self.front:
+            return {
+                'message': 'Нет цены и количества билетов с заданной рентабельностью',
+                'success': False
+            }
+        points = [self.evaluate(amount, price) for amount, price in self.front]
+        best = max(points, key=itemgetter(self.objective))
+        data = {
+            'front': [self.point_to_json(point) for point in points],
+            'best': self.point_to_json(best),
+            'objective': self.objective,
+            'evaluations': self.evaluations,
+            'success': self.success,
+            'message': self.message,
+        }
+        return data
+
+    def feasible(self, ticket_amount, ticket_price) -> bool:
+        self.evaluations += 1
+        return self.util.get_profit(ticket_amount, ticket_price) >= self.required_profit
+
+    def get_front(self) -> List[Tuple[int, int]]:
+        min_amount, max_amount = self.amount_range
+        prices = range(self.price_range[0], self.price_range[1] + 1, self.PRICE_STEP)
+        first = first_true(0, len(prices), lambda i: self.feasible(max_amount, prices[i]))
+        front = []
+        for price in prices[first:]:
+            best = front[-1][0] - 1 if front else max_amount
+            lowest = max(min_amount, ceil(self.util.total_cost / price))
+            if lowest > best or not self.feasible(best, price):
+                continue
+            amount = first_true(lowest, best, lambda a: self.feasible(a, price))
+            front.append((amount, price))
+            if amount == min_amount:
+                break
+        return front
+
+    def evaluate(self, ticket_amount, ticket_price) -> Dict:
+        util = self.util
+        util.calculate(self.write_off, ticket_amount, ticket_price,
+                       self.referral_coeff, self.discount)
+        return {
+            'ticket_amount': util.ticket_amount,
+            'ticket_price': util.ticket_price,
+            'write_off': util.write_off,
+            'min_profit': util.min_profit,
+            'min_rentability': util.min_rentability,
+            'max_rentability': util.max_rentability,
+        }
+
+    @staticmethod
+    def point_to_json(point):
+        data = dict(point)
+        data['min_profit'] = round(point['min_profit'])
+        data['min_rentability'] = round(point['min_rentability'], 2)
+        data['max_rentability'] = round(point['max_rentability'], 2)
+        return data
+
+
+def first_true(lo: int, hi: int, predicate: Callable[[int], bool]) -> int:
+    """smallest x in [lo, hi) with predicate(x) for a monotone predicate, hi if none"""
+    while lo < hi:
+        mid = (lo + hi) // 2
+        if predicate(mid):
+            hi = mid
+        else:
+            lo = mid + 1
+    return lo
+
+
 if __name__ == '__main__':
     input_data = {
         'lots': [
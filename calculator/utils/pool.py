@@ -0,0 +1,32 @@
+from concurrent.futures import ProcessPoolExecutor
+import os
+import threading
+from typing import Optional
+
+
+MAX_WORKERS = 4
+
+_pool = None
+_lock = threading.Lock()
+
+
+def process_pool(max_workers: Optional[int] = None) -> ProcessPoolExecutor:
+    """
+    The process pool shared by every caller in this process. It is started on
+    first use with max_workers, at most MAX_WORKERS, later values are ignored.
+    A pool broken by a dead worker is replaced.
+    """
+    global _pool
+    with _lock:
+        if _pool is None or _pool._broken:
+            workers = min(max_workers or os.cpu_count() or 1, MAX_WORKERS)
+            _pool = ProcessPoolExecutor(workers)
+        return _pool
+
+
+def shutdown_process_pool():
+    global _pool
+    with _lock:
+        if _pool is not None:
+            _pool.shutdown()
+            _pool = None
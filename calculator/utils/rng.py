@@ -0,0 +1,41 @@
+"""
+Per-request random generators. Every run gets its own PCG64 generator made
+from a 128 bit seed, so a run can be repeated from the stored seed and
+threads never share a generator. Parallel chunks take independent streams
+spawned from the same seed.
+"""
+from typing import List, Optional
+
+import numpy as np
+
+
+def resolve_seed(seed: Optional[int] = None) -> int:
+    """the given seed or a fresh one from the OS entropy"""
+    return int(np.random.SeedSequence(seed).entropy)
+
+
+def make_rng(seed: int) -> np.random.Generator:
+    return np.random.Generator(np.random.PCG64(np.random.SeedSequence(seed)))
+
+
+def spawn_seeds(seed: int, n: int) -> List[np.random.SeedSequence]:
+    """n independent seeds, the same ones for the same seed"""
+    return np.random.SeedSequence(seed).spawn(n)
+
+
+def spawn_rngs(seed: int, n: int) -> List[np.random.Generator]:
+    return [np.random.Generator(np.random.PCG64(child)) for child in spawn_seeds(seed, n)]
+
+
+def sample_without_replacement(n: int, k: int, rng: np.random.Generator) -> np.ndarray:
+    """
+    k distinct integers from range(n) in ascending order by Floyd's algorithm,
+    O(k) time and memory however large n is.
+    """
+    if not 0 <= k <= n:
+        raise ValueError('Sample larger than population or is negative')
+    draws = rng.integers(0, np.arange(n - k, n, dtype=np.int64) + 1)
+    chosen = set()
+    for j, t in zip(range(n - k, n), draws.tolist()):
+        chosen.add(j if t in chosen else t)
+    return np.sort(np.fromiter(chosen, dtype=np.int64, count=k))
@@ -0,0 +1,161 @@
+from decimal import Decimal, ROUND_HALF_UP
+from typing import Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from calculator.utils.rng import make_rng, resolve_seed
+
+
+CHUNK_SIZE = 4096
+MIN_CHUNK_SIZE = 16
+MAX_CHUNK_SIZE = 1 << 16
+
+
+def to_cents(value) -> int:
+    cents = Decimal(str(value)) * 100
+    return int(cents.to_integral_value(rounding=ROUND_HALF_UP))
+
+
+class BoxSimulation:
+    """
+    Opens a black box the same way open_box_n_times does, but in integer
+    cents and in chunks.
+
+    While every item left in the box is affordable, drawing proportionally to
+    the remaining amounts is the same as reading a random permutation of the
+    remaining items, so such stretches are drawn in bulk with NumPy. Steps
+    where the budget excludes some category are drawn one at a time.
+
+    Without rng the generator is made from seed (a fresh one if it is None),
+    which is kept in self.seed to repeat the run.
+    """
+    def __init__(self, amounts: Sequence[int], costs: Sequence,
+                 box_price, rng: Optional[np.random.Generator] = None,
+                 chunk_size: int = CHUNK_SIZE, seed: Optional[int] = None):
+        self.remaining = [int(amount) for amount in amounts]
+        self.costs = [to_cents(cost) for cost in costs]
+        self.price = to_cents(box_price)
+        self.seed = None
+        if rng is None:
+            self.seed = resolve_seed(seed)
+            rng = make_rng(self.seed)
+        self.rng = rng
+        self.chunk_size = chunk_size
+        self.k = len(self.remaining)
+        self.opened = 0
+        self.giveaway = 0
+        self.exhausted = False
+        self._costs = np.array(self.costs, dtype=np.int64)
+        self._categories = np.arange(self.k, dtype=np.int8)
+        self._block_size = MIN_CHUNK_SIZE
+
+    def run(self, n: int) -> Iterator[np.ndarray]:
+        """yield category indices of the next n openings in chunks"""
+        buffer: List[np.ndarray] = []
+        buffered = 0
+        pending: List[int] = []
+        target = self.opened + n
+        while self.opened < target and not self.exhausted:
+            if self.all_affordable():
+                if pending:
+                    buffer.append(np.array(pending, dtype=np.int8))
+                    buffered += len(pending)
+                    pending = []
+                block = self.open_block(target - self.opened)
+                buffer.append(block)
+                buffered += len(block)
+            else:
+                item = self.open_one()
+                if item is None:
+                    break
+                pending.append(item)
+            if buffered + len(pending) >= self.chunk_size:
+                yield self.flush(buffer, pending)
+                buffer, buffered, pending = [], 0, []
+        if buffered or pending:
+            yield self.flush(buffer, pending)
+
+    @staticmethod
+    def flush(buffer: List[np.ndarray], pending: List[int]) -> np.ndarray:
+        if pending:
+            buffer.append(np.array(pending, dtype=np.int8))
+        return np.concatenate(buffer)
+
+    def slack(self) -> int:
+        return self.price * (self.opened + 1) - self.giveaway
+
+    def all_affordable(self) -> bool:
+        slack = self.slack()
+        return all(cost <= slack for cost, amount
+                   in zip(self.costs, self.remaining) if amount > 0)\
+            and any(self.remaining)
+
+    def open_one(self) -> Optional[int]:
+        slack = self.slack()
+        weights = [amount if amount > 0 and cost <= slack else 0
+                   for amount, cost in zip(self.remaining, self.costs)]
+        total = sum(weights)
+        if total == 0:
+            self.exhausted = True
+            return None
+        point = int(self.rng.integers(total))
+        for item, weight in enumerate(weights):
+            if point < weight:
+                break
+            point -= weight
+        self.take(item)
+        return item
+
+    def take(self, item: int):
+        self.remaining[item] -= 1
+        self.giveaway += self.costs[item]
+        self.opened += 1
+
+    def open_block(self, left: int) -> np.ndarray:
+        """
+        Draw the next items as a prefix of a random permutation of the box and
+        keep them up to the first step where some remaining item would not be
+        affordable.
+        """
+        remaining = np.array(self.remaining, dtype=np.int64)
+        m = int(min(self._block_size, left, remaining.sum()))
+        counts = self.rng.multivariate_hypergeometric(remaining, m)
+        block = np.repeat(self._categories, counts)
+        self.rng.shuffle(block)
+
+        block_costs = self._costs[block]
+        paid = np.cumsum(block_costs)
+        gained = self.price * np.arange(self.opened + 1, self.opened + m + 1,
+                                        dtype=np.int64)
+        slack = gained - (self.giveaway + paid - block_costs)
+        max_cost = np.full(m, -1, dtype=np.int64)
+        for item in np.argsort(self._costs, kind='stable'):
+            if remaining[item] == 0:
+                continue
+            available = m
+            if counts[item] == remaining[item]:
+                available = int(np.flatnonzero(block == item)[-1]) + 1
+            max_cost[:available] = self._costs[item]
+        affordable = max_cost <= slack
+        j = m if affordable.all() else int(np.argmin(affordable))
+
+        if j == m:
+            self._block_size = min(2 * self._block_size, MAX_CHUNK_SIZE)
+        else:
+            self._block_size = max(2 * j, MIN_CHUNK_SIZE)
+        accepted = block[:j]
+        for item, amount in enumerate(np.bincount(accepted, minlength=self.k)):
+            self.remaining[item] -= int(amount)
+        self.giveaway += int(paid[j - 1]) if j else 0
+        self.opened += j
+        return accepted
+
+
+def simulate_openings(n: int, amounts: Sequence[int], costs: Sequence,
+                      box_price, rng: Optional[np.random.Generator] = None,
+                      chunk_size: int = CHUNK_SIZE, seed: Optional[int] = None) -> np.ndarray:
+    simulation = BoxSimulation(amounts, costs, box_price, rng, chunk_size, seed)
+    chunks = list(simulation.run(n))
+    if not chunks:
+        return np.empty(0, dtype=np.int8)
+    return np.concatenate(chunks)
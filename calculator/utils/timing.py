@@ -0,0 +1,74 @@
+"""
+Timing spans of the current request. The profiling middleware activates a
+Profile, span() and timed() add to it and do nothing outside of a profiled
+request, e.g. in batch worker processes.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from time import perf_counter
+from typing import Dict, Optional
+
+
+_current_profile = ContextVar('profile', default=None)
+
+
+class Profile:
+    def __init__(self):
+        self.spans: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+        self.queries = 0
+        self.sql_time = 0.0
+        self.total = 0.0
+        self.alloc_peak = None
+
+    def add(self, name: str, duration: float):
+        self.spans[name] = self.spans.get(name, 0) + duration
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    def record_query(self, execute, sql, params, many, context):
+        """django execute_wrapper hook"""
+        start = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.queries += 1
+            self.sql_time += perf_counter() - start
+
+
+def activate(profile: Profile):
+    return _current_profile.set(profile)
+
+
+def deactivate(token):
+    _current_profile.reset(token)
+
+
+def current_profile() -> Optional[Profile]:
+    return _current_profile.get()
+
+
+@contextmanager
+def span(name: str):
+    profile = _current_profile.get()
+    if profile is None:
+        yield
+        return
+    start = perf_counter()
+    try:
+        yield
+    finally:
+        profile.add(name, perf_counter() - start)
+
+
+def timed(name: Optional[str] = None):
+    """decorator form of span, named after the function by default"""
+    def decorator(func):
+        label = name or func.__qualname__
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(label):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
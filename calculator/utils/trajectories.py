@@ -0,0 +1,119 @@
+from functools import partial
+from typing import Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+from calculator.utils.pool import process_pool
+from calculator.utils.rng import resolve_seed, spawn_seeds
+from calculator.utils.simulation import BoxSimulation
+
+
+SHARD_RUNS = 64
+POOL_THRESHOLD = 1024
+QUANTILES = (0.05, 0.25, 0.5, 0.75, 0.95)
+
+
+class TrajectoryStats:
+    """
+    Running sums over full-depletion runs of a box, O(n * k) memory for any
+    number of runs. Shards are merged with merge().
+    """
+    def __init__(self, n: int, k: int):
+        self.runs = 0
+        self.category_counts = np.zeros((n, k), dtype=np.int64)
+        self.openings = np.zeros(n + 1, dtype=np.int64)
+        self.payout_sum = np.zeros(n)
+        self.payout_squares = np.zeros(n)
+        self.profit_sum = 0
+        self.profit_squares = 0
+
+    def add(self, items: np.ndarray, costs: np.ndarray, price: int):
+        """add a run given by its category indices and costs in cents"""
+        m = len(items)
+        self.runs += 1
+        self.category_counts[np.arange(m), items] += 1
+        self.openings[m] += 1
+        payout = np.empty(len(self.payout_sum))
+        payout[:m] = np.cumsum(costs[items])
+        payout[m:] = payout[m - 1] if m else 0
+        self.payout_sum += payout
+        self.payout_squares += payout ** 2
+        profit = price * m - int(payout[-1]) if len(payout) else 0
+        self.profit_sum += profit
+        self.profit_squares += profit ** 2
+
+    def merge(self, other: 'TrajectoryStats') -> 'TrajectoryStats':
+        self.runs += other.runs
+        self.category_counts += other.category_counts
+        self.openings += other.openings
+        self.payout_sum += other.payout_sum
+        self.payout_squares += other.payout_squares
+        self.profit_sum += other.profit_sum
+        self.profit_squares += other.profit_squares
+        return self
+
+    def quantile(self, q: float) -> int:
+        """smallest number of openings that q of the runs don't exceed"""
+        return int(np.searchsorted(np.cumsum(self.openings), q * self.runs))
+
+    def to_json(self, categories: Sequence[str]) -> Dict:
+        runs = self.runs
+        payout_mean = self.payout_sum / runs
+        payout_std = np.sqrt(np.maximum(self.payout_squares / runs - payout_mean ** 2, 0))
+        profit_mean = self.profit_sum / runs
+        profit_std = max(self.profit_squares / runs - profit_mean ** 2, 0) ** 0.5
+        openings = np.arange(len(self.openings))
+        return {
+            'runs': runs,
+            'openings': {
+                'mean': float(self.openings @ openings / runs),
+                'quantiles': {str(q): self.quantile(q) for q in QUANTILES},
+            },
+            'payout': {
+                'mean': (payout_mean / 100).tolist(),
+                'std': (payout_std / 100).tolist(),
+            },
+            'profit': {'mean': profit_mean / 100, 'std': profit_std / 100},
+            'probabilities': dict(zip(categories, (self.category_counts.T / runs).tolist())),
+        }
+
+
+def simulate_shard(amounts: Sequence[int], costs: Sequence, box_price,
+                   runs: int, seed: np.random.SeedSequence) -> TrajectoryStats:
+    rng = np.random.Generator(np.random.PCG64(seed))
+    n = sum(amounts)
+    stats = TrajectoryStats(n, len(amounts))
+    for _ in range(runs):
+        simulation = BoxSimulation(amounts, costs, box_price, rng=rng)
+        chunks = list(simulation.run(n))
+        items = np.concatenate(chunks) if chunks else np.empty(0, dtype=np.int8)
+        stats.add(items, np.array(simulation.costs, dtype=np.int64), simulation.price)
+    return stats
+
+
+def simulate_trajectories(amounts: Sequence[int], costs: Sequence, box_price,
+                          runs: int, seed: Optional[int] = None,
+                          pool_threshold: int = POOL_THRESHOLD,
+                          max_workers: Optional[int] = None) -> Tuple[int, TrajectoryStats]:
+    """
+    Open the box until it is empty or stuck, runs times. The runs are split
+    into shards of SHARD_RUNS with their own streams spawned from seed, so the
+    result only depends on the seed, not on the number of workers.
+    """
+    seed = resolve_seed(seed)
+    amounts = [int(amount) for amount in amounts]
+    shard_runs = [min(SHARD_RUNS, runs - start) for start in range(0, runs, SHARD_RUNS)]
+    seeds = spawn_seeds(seed, len(shard_runs))
+    shard = partial(simulate_shard, amounts, list(costs), box_price)
+    if runs < pool_threshold:
+        results = map(shard, shard_runs, seeds)
+        return seed, merge_shards(results, amounts)
+    pool = process_pool(max_workers)
+    return seed, merge_shards(pool.map(shard, shard_runs, seeds), amounts)
+
+
+def merge_shards(results, amounts) -> TrajectoryStats:
+    stats = TrajectoryStats(sum(amounts), len(amounts))
+    for result in results:
+        stats.merge(result)
+    return stats
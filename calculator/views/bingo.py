@@ -1,22 +1,36 @@
+from django.db.models import Prefetch
+
 from .mixins import CalculateViewSet
 
 from calculator.utils.bingo import DiscountBingoUtil, BoosterBingoUtil
-from calculator.models.bingodiscount import BingoDiscount
+from calculator.models.bingodiscount import BingoDiscount, DiscountProduct
 from calculator.serializers.bingodiscount import BingoSerializer, CalculateSerializer
+from calculator.serializers.mixins import requested_fields
 from calculator.serializers.bingobooster import CalculateBoosterSerializer, BoosterSerializer
 from calculator.models.bingobooster import BingoBooster
 
 
 class BingoViewSet(CalculateViewSet):
     serializer_class = BingoSerializer
-    queryset = BingoDiscount.objects.all()
+    queryset = BingoDiscount.objects.prefetch_related(
+        Prefetch('bingo_items',
+                 queryset=DiscountProduct.objects.select_related('lot', 'discount'))
+    )
     model_class = BingoDiscount
     util_class = DiscountBingoUtil
+    calculate_serializer_class = CalculateSerializer
+    matrix_fields = {'prices', 'discounts', 'budget_distribution',
+                     'participants_per_lot', 'amounts'}
+    query_budgets = {
+        'list': 2, 'retrieve': 2, 'create': 1, 'update': 3, 'destroy': 13,
+        'calculate': 0, 'calculate_batch': 0,
+    }
 
-    def get_serializer_class(self):
-        if self.action == 'calculate':
-            return CalculateSerializer
-        return super().get_serializer_class()
+    def get_queryset(self):
+        fields = requested_fields(self.request)
+        if fields is not None and fields.isdisjoint(self.matrix_fields):
+            return BingoDiscount.objects.all()
+        return super().get_queryset()
 
 
 class BoosterViewSet(CalculateViewSet):
@@ -24,9 +38,9 @@ class BoosterViewSet(CalculateViewSet):
     queryset = BingoBooster.objects.all()
     model_class = BingoBooster
     util_class = BoosterBingoUtil
-
-    def get_serializer_class(self):
-        if self.action == 'calculate':
-            return CalculateBoosterSerializer
-        return super().get_serializer_class()
+    calculate_serializer_class = CalculateBoosterSerializer
+    query_budgets = {
+        'list': 1, 'retrieve': 1, 'create': 2, 'update': 2, 'destroy': 4,
+        'calculate': 0, 'calculate_batch': 0,
+    }
 
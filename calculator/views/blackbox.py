@@ -1,37 +1,70 @@
+from django.conf import settings
+from django.db.models import Prefetch
 from rest_framework import status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from calculator.utils.blackbox import BlackBoxUtil
-from calculator.models.blackbox import BlackBox
+from calculator.utils.blackbox import BlackBoxUtil, BlackBoxGridUtil, LOT_CATEGORIES
+from calculator.utils.trajectories import POOL_THRESHOLD
+from calculator.models.blackbox import BlackBox, BlackBoxItem
+from calculator.serializers.mixins import requested_fields
 from calculator.serializers.blackbox import BlackBoxSerializer,\
-    CalculateSerializer, MockOpenSerializer, MockOpenUnsavedSerializer
+    CalculateSerializer, CalculateGridSerializer, MockOpenSerializer,\
+    MockOpenUnsavedSerializer, DistributionSerializer, SimulateSerializer
 from .mixins import CalculateViewSet
+from .streaming import mock_open_response
 
 
 class BlackBoxViewSet(CalculateViewSet):
     serializer_class = BlackBoxSerializer
-    queryset = BlackBox.objects.all()
+    queryset = BlackBox.objects.prefetch_related(
+        Prefetch('items', queryset=BlackBoxItem.objects.select_related('product'))
+    )
     model_class = BlackBox
     util_class = BlackBoxUtil
+    calculate_serializer_class = CalculateSerializer
+    item_fields = {'lot_cost', 'lot_amount', 'max_count_costly'}
+    query_budgets = {
+        'list': 2, 'retrieve': 2, 'create': 4, 'update': 6, 'destroy': 6,
+        'calculate': 0, 'calculate_batch': 0, 'calculate_grid': 0,
+        'mock_open': 2, 'mock_open_unsaved': 0, 'distribution': 2, 'simulate': 2,
+    }
+
+    def get_queryset(self):
+        fields = requested_fields(self.request)
+        if fields is not None and fields.isdisjoint(self.item_fields):
+            return BlackBox.objects.all()
+        return super().get_queryset()
 
     def get_serializer_class(self):
-        if self.action == 'calculate':
-            return CalculateSerializer
+        if self.action == 'calculate_grid':
+            return CalculateGridSerializer
         if self.action == 'mock_open':
             return MockOpenSerializer
         if self.action == 'mock_open_unsaved':
             return MockOpenUnsavedSerializer
+        if self.action == 'distribution':
+            return DistributionSerializer
+        if self.action == 'simulate':
+            return SimulateSerializer
         return super().get_serializer_class()
 
+    @action(detail=False, methods=['post'])
+    def calculate_grid(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            grid = BlackBoxGridUtil(**serializer.validated_data)
+            return Response(grid.to_json())
+        return Response(serializer.errors,
+                        status=status.HTTP_400_BAD_REQUEST)
+
     @action(detail=True, methods=['post'])
     def mock_open(self, request, pk):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            bb = BlackBox.objects.get(pk=pk)
-            product_categories = bb.mock_open(serializer.data.get('n'))
-            data = {'product_categories': product_categories}
-            return Response(data)
+            bb = self.get_object()
+            return mock_open_response(bb.simulation(serializer.validated_data.get('seed')),
+                                      serializer.data.get('n'), serializer.data.get('output'))
 
         return Response(serializer.errors,
                         status=status.HTTP_400_BAD_REQUEST)
@@ -40,9 +73,39 @@ class BlackBoxViewSet(CalculateViewSet):
     def mock_open_unsaved(self, request):
         serializer = self.get_serializer(data=request.data)
         if serializer.is_valid():
-            bb = BlackBox.from_json(serializer.data)
-            bb.save()
-            product_categories = bb.mock_open(serializer.data.get('n'))
-            data = {'product_categories': product_categories}
-            bb.delete()
+            simulation = BlackBox.unsaved_simulation(serializer.validated_data)
+            return mock_open_response(simulation, serializer.data.get('n'),
+                                      serializer.data.get('output'))
+
+        return Response(serializer.errors,
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['post'])
+    def distribution(self, request, pk):
+        bb = self.get_object()
+        serializer = self.get_serializer(data=request.data, context={
+            **self.get_serializer_context(), 'amounts': bb.amounts(),
+        })
+        if serializer.is_valid():
+            distribution = bb.distribution(serializer.data.get('n'))
+            return Response(distribution.to_json(LOT_CATEGORIES))
+
+        return Response(serializer.errors,
+                        status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=True, methods=['post'])
+    def simulate(self, request, pk):
+        serializer = self.get_serializer(data=request.data)
+        if serializer.is_valid():
+            bb = self.get_object()
+            seed, stats = bb.simulate(
+                serializer.validated_data['runs'], serializer.validated_data.get('seed'),
+                pool_threshold=getattr(settings, 'SIMULATE_POOL_THRESHOLD', POOL_THRESHOLD),
+                max_workers=getattr(settings, 'PROCESS_POOL_WORKERS', None),
+            )
+            data = stats.to_json(LOT_CATEGORIES)
+            data['seed'] = str(seed)
             return Response(data)
+
+        return Response(serializer.errors,
+                        status=status.HTTP_400_BAD_REQUEST)
@@ -0,0 +1,12 @@
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from calculator.cache import get_calculation_cache
+
+
+class CalculateCacheView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_calculation_cache().stats())
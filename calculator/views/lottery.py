@@ -1,8 +1,15 @@
+from rest_framework import status
+from rest_framework.decorators import action
+from rest_framework.response import Response
+
 from .mixins import CalculateViewSet
 
-from calculator.utils.lottery import LotteryUtil
+from calculator.cache import save_lottery_session, load_lottery_session,\
+    delete_lottery_session, LotterySessionConflict
+from calculator.utils.lottery import LotteryUtil, LotterySession, LotteryOptimizer
 from calculator.models.lottery import Lottery
-from calculator.serializers.lottery import LotterySerializer, CalculateSerializer
+from calculator.serializers.lottery import LotterySerializer, CalculateSerializer,\
+    LotterySessionSerializer, OptimizeSerializer
 
 
 class LotteryViewSet(CalculateViewSet):
@@ -10,8 +17,79 @@ class LotteryViewSet(CalculateViewSet):
     queryset = Lottery.objects.all()
     model_class = Lottery
     util_class = LotteryUtil
+    calculate_serializer_class = CalculateSerializer
+    query_budgets = {
+        'list': 1, 'retrieve': 1, 'create': 1, 'update': 2, 'destroy': 4,
+        'calculate': 0, 'calculate_batch': 0, 'optimize': 0, 'ticket': 3,
+    }
 
     def get_serializer_class(self):
-        if self.action == 'calculate':
+        if self.action == 'session':
             return CalculateSerializer
+        if self.action == 'session_detail':
+            return LotterySessionSerializer
+        if self.action == 'optimize':
+            return OptimizeSerializer
         return super().get_serializer_class()
+
+    @action(detail=True, methods=['get'], url_path=r'ticket/(?P<number>[0-9]+)')
+    def ticket(self, request, pk, number):
+        lottery = self.get_object()
+        number = int(number)
+        try:
+            product = lottery.get_ticket(number)
+        except ValueError as e:
+            return Response({'message': str(e)}, status=status.HTTP_404_NOT_FOUND)
+        data = {
+            'number': number,
+            'lucky': product is not None,
+            'price': product.price if product is not None else None,
+        }
+        return Response(data)
+
+    @action(detail=False, methods=['post'])
+    def optimize(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        data = LotteryOptimizer(**serializer.validated_data).to_json()
+        if not data['success']:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        return Response(data)
+
+    @action(detail=False, methods=['post'])
+    def session(self, request):
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session = LotterySession(**serializer.validated_data)
+        data = session.to_json()
+        if not data['success']:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        data['token'] = save_lottery_session(session)
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=['patch', 'delete'], url_path=r'session/(?P<token>[0-9a-f]+)')
+    def session_detail(self, request, token):
+        stored = load_lottery_session(token)
+        if stored is None:
+            return Response({'message': 'Сессия не найдена или устарела'},
+                            status=status.HTTP_404_NOT_FOUND)
+        version, session = stored
+        if request.method == 'DELETE':
+            delete_lottery_session(token)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        session.apply(serializer.validated_data['changes'])
+        data = session.to_json()
+        if not data['success']:
+            return Response(data, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            save_lottery_session(session, token, version)
+        except LotterySessionConflict:
+            return Response({'message': 'Сессия изменена другим запросом, повторите'},
+                            status=status.HTTP_409_CONFLICT)
+        data['token'] = token
+        return Response(data)
@@ -1,28 +1,83 @@
+from django.conf import settings
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from calculator.cache import get_calculation_cache
+from calculator.housekeeping import sweep_mock_products
+from calculator.queries import query_budget
+from calculator.utils.batch import run_batch, POOL_THRESHOLD
+from calculator.utils.timing import span
+
+
+class QueryBudgetMixin:
+    """query_budgets maps actions to the most queries a request may run"""
+    query_budgets = {}
+
+    def get_query_budget(self, request, action):
+        return self.query_budgets.get(action)
+
+    def dispatch(self, request, *args, **kwargs):
+        action = self.action_map.get(request.method.lower())
+        limit = self.get_query_budget(request, action)
+        if limit is None:
+            return super().dispatch(request, *args, **kwargs)
+        with query_budget(limit, f'{type(self).__name__}.{action}'):
+            return super().dispatch(request, *args, **kwargs)
+
+
+class CalculateViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
+    calculate_serializer_class = None
+
+    def get_serializer_class(self):
+        if self.action in ('calculate', 'calculate_batch'):
+            return self.calculate_serializer_class
+        return super().get_serializer_class()
 
-class CalculateViewSet(viewsets.ModelViewSet):
     def perform_create(self, serializer):
-        instance = self.model_class.from_json(serializer.data)
-        instance.save()
+        with span('from_json'):
+            instance = self.model_class.from_json(serializer.data)
+            instance.save()
 
     def perform_update(self, serializer):
         instance = serializer.instance
         data = serializer.validated_data
-        instance = self.model_class.from_json(data, instance=instance)
-        instance.save()
+        with span('from_json'):
+            instance = self.model_class.from_json(data, instance=instance)
+            instance.save()
+        sweep_mock_products()
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        sweep_mock_products()
 
     @action(detail=False, methods=['post'])
     def calculate(self, request):
         serializer = self.get_serializer(data=request.data)
-        if serializer.is_valid():
-            util_instance = self.util_class(**serializer.data)
-            data = util_instance.to_json()
+        with span('validate'):
+            valid = serializer.is_valid()
+        if valid:
+            with span('calculate'):
+                data = get_calculation_cache().get_or_compute(
+                    self.util_class, serializer.data,
+                    lambda: self.util_class(**serializer.data).to_json()
+                )
             if data['success']:
                 return Response(data)
             else:
                 return Response(data, status=status.HTTP_400_BAD_REQUEST)
         return Response(serializer.errors,
                         status=status.HTTP_400_BAD_REQUEST)
+
+    @action(detail=False, methods=['post'])
+    def calculate_batch(self, request):
+        serializer = self.get_serializer(data=request.data, many=True)
+        if serializer.is_valid():
+            data = run_batch(
+                self.util_class, serializer.data,
+                pool_threshold=getattr(settings, 'CALCULATE_BATCH_POOL_THRESHOLD', POOL_THRESHOLD),
+                max_workers=getattr(settings, 'PROCESS_POOL_WORKERS', None),
+            )
+            return Response(data)
+        return Response(serializer.errors,
+                        status=status.HTTP_400_BAD_REQUEST)
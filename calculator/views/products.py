@@ -1,9 +1,11 @@
 from rest_framework import viewsets
 
-from calculator.models.product import Product
+from calculator.models.product import Product, MOCK_NAME
 from calculator.serializers.product import ProductSerializer
+from .mixins import QueryBudgetMixin
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(QueryBudgetMixin, viewsets.ModelViewSet):
     serializer_class = ProductSerializer
-    queryset = Product.objects.exclude(name='mock')
+    queryset = Product.objects.exclude(name=MOCK_NAME)
+    query_budgets = {'list': 1, 'retrieve': 1, 'create': 1, 'update': 2, 'destroy': 6}
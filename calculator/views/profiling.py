@@ -0,0 +1,17 @@
+from rest_framework import status
+from rest_framework.permissions import IsAdminUser
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from calculator.profiling import get_request_histogram
+
+
+class ProfilingView(APIView):
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        return Response(get_request_histogram().stats())
+
+    def delete(self, request):
+        get_request_histogram().clear()
+        return Response(status=status.HTTP_204_NO_CONTENT)
@@ -0,0 +1,93 @@
+import json
+
+import numpy as np
+from django.http import StreamingHttpResponse
+from rest_framework.response import Response
+
+from calculator.utils.blackbox import LOT_CATEGORIES
+
+
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+CATEGORY_NAMES = np.array(LOT_CATEGORIES)
+
+
+def mock_open_response(simulation, n, output='list'):
+    if output == 'list':
+        product_categories = []
+        for chunk in simulation.run(n):
+            product_categories.extend(CATEGORY_NAMES[chunk].tolist())
+        return Response({'product_categories': product_categories,
+                         'seed': seed_to_json(simulation.seed)})
+    if output == 'aggregate':
+        return Response(aggregate(simulation, n))
+    lines = ENCODERS[output](simulation, n)
+    return StreamingHttpResponse(
+        (json.dumps(line) + '\n' for line in lines),
+        content_type=NDJSON_CONTENT_TYPE
+    )
+
+
+def seed_to_json(seed):
+    return str(seed) if seed is not None else None
+
+
+def summary(simulation):
+    return {
+        'opened': simulation.opened,
+        'total_giveaway': simulation.giveaway / 100,
+        'ran_out_at': simulation.opened if simulation.exhausted else None,
+        'seed': seed_to_json(simulation.seed),
+    }
+
+
+def aggregate(simulation, n):
+    counts = np.zeros(len(LOT_CATEGORIES), dtype=np.int64)
+    for chunk in simulation.run(n):
+        counts += np.bincount(chunk, minlength=len(LOT_CATEGORIES))
+    data = {'counts': dict(zip(LOT_CATEGORIES, counts.tolist()))}
+    data.update(summary(simulation))
+    return data
+
+
+def encode_ndjson(simulation, n):
+    for chunk in simulation.run(n):
+        yield {'product_categories': CATEGORY_NAMES[chunk].tolist()}
+    yield summary(simulation)
+
+
+def encode_index(simulation, n):
+    yield {'categories': LOT_CATEGORIES}
+    for chunk in simulation.run(n):
+        digits = (chunk + ord('0')).astype(np.uint8).tobytes().decode('ascii')
+        yield {'indices': digits}
+    yield summary(simulation)
+
+
+def encode_rle(simulation, n):
+    """[category index, run length] pairs, runs are merged across chunks"""
+    yield {'categories': LOT_CATEGORIES}
+    last = None
+    for chunk in simulation.run(n):
+        starts = np.flatnonzero(np.diff(chunk, prepend=-1))
+        lengths = np.diff(np.append(starts, len(chunk)))
+        runs = [[int(item), int(length)]
+                for item, length in zip(chunk[starts], lengths)]
+        if last is not None:
+            if runs[0][0] == last[0]:
+                runs[0][1] += last[1]
+            else:
+                runs.insert(0, last)
+        last = runs.pop()
+        if runs:
+            yield {'runs': runs}
+    if last is not None:
+        yield {'runs': [last]}
+    yield summary(simulation)
+
+
+ENCODERS = {
+    'ndjson': encode_ndjson,
+    'index': encode_index,
+    'rle': encode_rle,
+}
@@ -34,6 +34,7 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 MIDDLEWARE = [
+    'calculator.profiling.ProfilingMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'corsheaders.middleware.CorsMiddleware',
@@ -89,6 +90,27 @@ DATABASES = {
 """
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# 'shared' is seen by every worker, migrate creates its table
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'calculator_cache',
+    },
+}
+
+LOTTERY_SESSION_CACHE = 'shared'
+
+MOCK_PRODUCTS_GC = {
+    'CACHE': 'shared',
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/3.2/ref/settings/#auth-password-validators
 
@@ -111,6 +133,7 @@ AUTH_PASSWORD_VALIDATORS = [
 REST_FRAMEWORK = {
     'COERCE_DECIMAL_TO_STRING': False,
     'DEFAULT_SCHEMA_CLASS': 'rest_framework.schemas.coreapi.AutoSchema',
+    'DEFAULT_PAGINATION_CLASS': 'calculator.pagination.OptionalCursorPagination',
 }
 
 
@@ -138,6 +161,10 @@ STATIC_URL = '/static/'
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
+PROFILING = {
+    'ENABLED': bool(int(os.environ.get("PROFILING", 0))),
+}
+
 
 import dj_database_url
 db_from_env = dj_database_url.config(conn_max_age=500)